@@ -0,0 +1 @@
+"""Offline benchmarks for the fetch -> parse -> emit pipeline (see the Benchmarks section of README.md)."""
@@ -0,0 +1,61 @@
+"""
+Measures how the bulk re-parse scales with worker processes: writes a
+directory of synthetic EUC-KR pages, parses it with 1, 2, 4 ... workers (up to
+the core count) and prints pages/sec and the speedup over one worker.
+
+    python -m benchmarks.bulk_scaling
+    python -m benchmarks.bulk_scaling --pages 400 --rows 60 --chunk-size 4
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from kt_tvguide.bulk import bulk_parse
+from kt_tvguide.emitters import JsonEmitter
+
+from .fixtures import FIXTURE_ENCODING, synthesize_schedule_html
+
+def _worker_counts(max_workers):
+    counts = []
+    count = 1
+    while count < max_workers:
+        counts.append(count)
+        count *= 2
+    return counts + [max_workers]
+
+def write_pages(directory, num_pages, rows):
+    for index in range(num_pages):
+        channel_id = str(index % 50 + 1)
+        date_str = f"202506{index // 50 % 28 + 1:02d}"
+        page = synthesize_schedule_html(rows, seed=index)
+        with open(os.path.join(directory, f"kt_pschedule_{channel_id}_{date_str}.html"), 'wb') as f:
+            f.write(page.encode(FIXTURE_ENCODING))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.bulk_scaling')
+    parser.add_argument('--pages', type=int, default=200)
+    parser.add_argument('--rows', type=int, default=60, help='Programs per synthetic page')
+    parser.add_argument('--chunk-size', type=int, default=8)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        source_dir = os.path.join(work_dir, 'pages')
+        os.makedirs(source_dir)
+        write_pages(source_dir, args.pages, args.rows)
+        print(f"{args.pages} page(s) x {args.rows} row(s), chunk size {args.chunk_size}, {os.cpu_count()} core(s)")
+        single_rate = None
+        for workers in _worker_counts(args.max_workers):
+            output_dir = os.path.join(work_dir, f"out_{workers}")
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                bulk_parse(source_dir, [JsonEmitter()], output_dir, workers, args.chunk_size)
+            rate = args.pages / (time.perf_counter() - started)
+            single_rate = single_rate or rate
+            print(f"  {workers:>3} worker(s): {rate:8.1f} pages/s   x{rate / single_rate:.2f}")
+
+if __name__ == "__main__":
+    main()
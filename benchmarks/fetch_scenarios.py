@@ -0,0 +1,121 @@
+"""
+Replays upstream failure modes against the stand-in server and checks how the
+fetch policy and the stale-cache fallback handle them. Exits non-zero if any
+scenario misbehaves.
+
+    python -m benchmarks.fetch_scenarios
+"""
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+from kt_tvguide.emitters import JsonEmitter
+from kt_tvguide.fetch import FetchPolicy, create_http_session, fetch_schedule_html_post
+from kt_tvguide.metrics import RUN_METRICS
+from kt_tvguide.pipeline import run_pipeline
+
+from .stand_in_server import StandInScheduleServer
+
+# Tight settings so the whole suite runs in a few seconds
+FAST_POLICY = dict(connect_timeout=0.5, read_timeout=0.5, max_retries=2, backoff_base=0.05, backoff_max=0.2, deadline=5)
+
+def _fetch(server, **policy_overrides):
+    policy = FetchPolicy(**dict(FAST_POLICY, **policy_overrides))
+    RUN_METRICS.reset()
+    session = create_http_session()
+    started = time.monotonic()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            html_text = fetch_schedule_html_post('7', session=session, url=server.url, policy=policy)
+    finally:
+        session.close()
+    return html_text, time.monotonic() - started, dict((name, value) for (name, _), value in RUN_METRICS.counters.items())
+
+def _counter(counters, name):
+    return counters.get(name, 0)
+
+def scenario_transient_503(server):
+    server.fail_next(2, 'status:503')
+    html_text, _, counters = _fetch(server)
+    return html_text and _counter(counters, 'fetch_retries_total') == 2, "two 503s, then the page"
+
+def scenario_persistent_503(server):
+    server.fail_next(10, 'status:503')
+    html_text, _, counters = _fetch(server)
+    return html_text is None and _counter(counters, 'fetch_retries_total') == 2, "gives up after max_retries"
+
+def scenario_not_found_is_not_retried(server):
+    server.fail_next(1, 'status:404')
+    html_text, _, counters = _fetch(server)
+    return html_text is None and _counter(counters, 'fetch_retries_total') == 0, "404 fails without retrying"
+
+def scenario_read_timeout(server):
+    server.fail_next(1, 'hang:1.5')
+    html_text, elapsed, counters = _fetch(server)
+    return html_text and _counter(counters, 'fetch_retries_total') == 1 and elapsed < 1.5, "hung request times out and is retried"
+
+def scenario_connection_reset(server):
+    server.fail_next(1, 'reset')
+    html_text, _, counters = _fetch(server)
+    return html_text and _counter(counters, 'fetch_retries_total') == 1, "dropped connection is retried"
+
+def scenario_truncated_body(server):
+    server.fail_next(1, 'truncate')
+    html_text, _, counters = _fetch(server)
+    return html_text and _counter(counters, 'fetch_retries_total') == 1, "short body is retried"
+
+def scenario_hedged_request(server):
+    server.fail_next(1, 'hang:1.5')
+    html_text, elapsed, counters = _fetch(server, read_timeout=3, hedge_after=0.2)
+    ok = html_text and elapsed < 1.0 and _counter(counters, 'fetch_hedge_wins_total') == 1
+    return ok, f"hedge answers a slow first request ({elapsed:.2f}s)"
+
+def scenario_deadline(server):
+    server.fail_next(10, 'hang:0.8')
+    html_text, elapsed, _ = _fetch(server, max_retries=10, deadline=1.2)
+    return html_text is None and elapsed < 2.0, f"deadline bounds a hanging upstream ({elapsed:.2f}s)"
+
+def scenario_stale_fallback(server):
+    with tempfile.TemporaryDirectory() as work_dir:
+        cache_dir = os.path.join(work_dir, 'cache')
+        output_path = os.path.join(work_dir, 'tv_schedule.json')
+        policy = FetchPolicy(**FAST_POLICY)
+        with contextlib.redirect_stdout(io.StringIO()):
+            run_pipeline(['7'], 1, [JsonEmitter(output_path)], cache_dir=cache_dir, url=server.url, fetch_policy=policy)
+            os.remove(output_path)
+            server.fail_next(10, 'status:503')
+            run_pipeline(['7'], 1, [JsonEmitter(output_path)], cache_dir=cache_dir, url=server.url, fetch_policy=policy)
+        server.clear_failures()
+        with open(output_path, 'r', encoding='utf-8') as f:
+            schedule = json.load(f)['data'][0]
+        ok = 'error_summary' not in schedule and schedule.get('programs') and _counter(
+            dict((name, value) for (name, _), value in RUN_METRICS.counters.items()), 'stale_served_total') == 1
+    return ok, "upstream down: last good schedule served instead of an error file"
+
+SCENARIOS = [
+    scenario_transient_503,
+    scenario_persistent_503,
+    scenario_not_found_is_not_retried,
+    scenario_read_timeout,
+    scenario_connection_reset,
+    scenario_truncated_body,
+    scenario_hedged_request,
+    scenario_deadline,
+    scenario_stale_fallback,
+]
+
+def main():
+    failures = 0
+    for scenario in SCENARIOS:
+        with StandInScheduleServer() as server:
+            ok, description = scenario(server)
+        failures += not ok
+        print(f"{'PASS' if ok else 'FAIL'}  {scenario.__name__[len('scenario_'):]:<32} {description}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
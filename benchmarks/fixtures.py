@@ -0,0 +1,153 @@
+"""
+pSchedule.asp fixtures as EUC-KR pages, plus a synthetic page generator that
+scales to thousands of program rows. A fixture is either recorded (a live
+response saved with `record`) or reconstructed (REBUILD_SOURCES: a committed
+output re-rendered by render_schedule_html). Reconstructed pages have the
+programs of a real day but this module's markup, not KT's, so only recorded
+ones can catch parser regressions on real pages.
+
+    python -m benchmarks.fixtures record 7 [--date 20250601]   # save a live response
+    python -m benchmarks.fixtures rebuild                      # re-render the reconstructed fixtures
+"""
+import argparse
+import html
+import json
+import os
+import random
+from collections import OrderedDict
+from datetime import date as date_cls
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+FIXTURE_ENCODING = 'euc-kr'
+
+# Reconstructed fixtures and the committed outputs they are rendered from; every other fixture is a recorded response
+REBUILD_SOURCES = {
+    'kt_pschedule_7_20251204.html': ('kbs2_schedule.json', 7),
+    'kt_pschedule_7_20250531.html': ('script/kt_tv_schedule_7_20250531_today.json', 11),
+}
+
+_SYNTHETIC_TITLES = [
+    '생생정보', '일일드라마 친밀한 리플리', 'KBS 뉴스 9', '개는 훌륭하다', '걸어서 세계속으로',
+    '불후의 명곡', '사장님 귀는 당나귀 귀', '동물의 세계', '영화가 좋다', '역사저널 그날',
+]
+_SYNTHETIC_GENRES = ['교양/정보', '드라마', '뉴스', '연예/오락', '시사/다큐', '스포츠', '교육', '만화']
+_SYNTHETIC_ICONS = [
+    ['전체 시청 가능', 'Hd', 'Icon (src: /src/images/kt_tv/icons/icon_18x18_cap.png)'],
+    ['15세 이상 시청 가능', 'Hd'],
+    ['전체 시청 가능', 'Sd'],
+    ['12세 이상 시청 가능', 'Hd', 'Icon (src: /src/images/kt_tv/icons/icon_18x18_desc.png)'],
+]
+
+def fixture_path(name):
+    return os.path.join(FIXTURES_DIR, name)
+
+def list_fixtures():
+    return sorted(name for name in os.listdir(FIXTURES_DIR) if name.endswith('.html'))
+
+def fixture_kind(name):
+    """'reconstructed' for the fixtures rendered from committed outputs, 'recorded' for saved live responses."""
+    return 'reconstructed' if name in REBUILD_SOURCES else 'recorded'
+
+def load_fixture_bytes(name):
+    with open(fixture_path(name), 'rb') as f:
+        return f.read()
+
+def load_fixture(name):
+    """The fixture decoded the way fetch_schedule_html_post decodes live responses."""
+    return load_fixture_bytes(name).decode(FIXTURE_ENCODING)
+
+def _icon_html(icon):
+    if icon.startswith('Icon (src: ') and icon.endswith(')'):
+        return f'<b><img src="{html.escape(icon[11:-1])}" alt=""></b>'
+    return f'<b><img src="/src/images/kt_tv/icons/icon_18x18.png" alt="{html.escape(icon)}"></b>'
+
+def render_schedule_html(schedule_data, on_air_index=-1):
+    """Renders a parsed schedule back into a page with pSchedule.asp's structure."""
+    rows = OrderedDict()
+    for index, program in enumerate(schedule_data['programs']):
+        hour, minute = program['time'].split(':')
+        rows.setdefault(hour, []).append((minute, index, program))
+    year, month, day = schedule_data['date_displayed'].split('-')
+    parts = [
+        '<html><head><meta http-equiv="Content-Type" content="text/html; charset=euc-kr"></head><body>',
+        '<div class="tab_cont">',
+        f'<h5 class="b_logo"><img src="{html.escape(schedule_data["channel_logo_url"])}" '
+        f'alt="{html.escape(schedule_data["channel_name"])}"></h5>',
+        f'<strong class="day">{year}년 {int(month)}월 {int(day)}일</strong>',
+        '<table class="board tb_schedule" summary="편성표">',
+        '<thead><tr><th>시</th><th>분</th><th>프로그램</th><th>장르</th></tr></thead>',
+        '<tbody>',
+    ]
+    for hour, slot in rows.items():
+        minutes = ''.join(f'<p>{minute}</p>' for minute, _, _ in slot)
+        programs = ''
+        for _, index, program in slot:
+            badge = '<strong class="online">방송중</strong> ' if index == on_air_index else ''
+            icons = ''.join(_icon_html(icon) for icon in program['icons'])
+            programs += f'<p>{badge}{html.escape(program["title"])} {icons}</p>\n'
+        genres = ''.join(f'<p>{html.escape(program["genre"])}</p>' for _, _, program in slot)
+        parts.append(
+            f'<tr><td class="time">{hour}</td><td class="min">{minutes}</td>'
+            f'<td class="pro">{programs}</td><td class="category">{genres}</td></tr>'
+        )
+    parts.append('</tbody></table></div></body></html>')
+    return '\n'.join(parts)
+
+def synthesize_schedule_html(num_rows, seed=0, schedule_date=date_cls(2025, 6, 1), channel_name='KBS2'):
+    """A realistic-looking page with `num_rows` programs spread over the day's hour slots."""
+    rng = random.Random(seed)
+    programs = []
+    for index in range(num_rows):
+        minute_of_day = index * (24 * 60) // max(num_rows, 1)
+        programs.append({
+            'time': f"{minute_of_day // 60:02d}:{minute_of_day % 60:02d}",
+            'title': f"{rng.choice(_SYNTHETIC_TITLES)} {rng.randint(1, 300)}회",
+            'icons': rng.choice(_SYNTHETIC_ICONS),
+            'genre': rng.choice(_SYNTHETIC_GENRES),
+        })
+    schedule_data = {
+        'date_displayed': schedule_date.isoformat(),
+        'channel_name': channel_name,
+        'channel_logo_url': 'https://tv.kt.com/relatedmaterial/ch_logo/skylife/a813974300226102119.png',
+        'programs': programs,
+    }
+    return render_schedule_html(schedule_data, on_air_index=num_rows // 2)
+
+def rebuild_fixtures(repo_root):
+    for name, (source, on_air_index) in REBUILD_SOURCES.items():
+        with open(os.path.join(repo_root, source), 'r', encoding='utf-8') as f:
+            schedule_data = json.load(f)
+        if 'data' in schedule_data:
+            schedule_data = schedule_data['data'][0]
+        with open(fixture_path(name), 'wb') as f:
+            f.write(render_schedule_html(schedule_data, on_air_index).encode(FIXTURE_ENCODING))
+        print(f"Rebuilt {name} from {source}")
+
+def record_fixture(channel_id, date_str_yyyymmdd=None):
+    from kt_tvguide.fetch import fetch_schedule_html_post
+
+    html_text = fetch_schedule_html_post(channel_id, date_str_yyyymmdd)
+    if not html_text:
+        print("Fetch failed; nothing recorded.")
+        return None
+    name = f"kt_pschedule_{channel_id}_{date_str_yyyymmdd or date_cls.today().strftime('%Y%m%d')}.html"
+    with open(fixture_path(name), 'wb') as f:
+        f.write(html_text.encode(FIXTURE_ENCODING, errors='xmlcharrefreplace'))
+    print(f"Recorded {name}")
+    return name
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.fixtures')
+    commands = parser.add_subparsers(dest='command', required=True)
+    record_cmd = commands.add_parser('record', help='Save a live pSchedule.asp response as a fixture')
+    record_cmd.add_argument('channel_id')
+    record_cmd.add_argument('--date', help='YYYYMMDD (default: server current day)')
+    commands.add_parser('rebuild', help='Re-render the reconstructed fixtures from committed outputs')
+    args = parser.parse_args(argv)
+    if args.command == 'record':
+        record_fixture(args.channel_id, args.date)
+    else:
+        rebuild_fixtures(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""
+Times the fetch -> parse -> emit stages on the fixtures and synthetic
+pages, fully offline, and fails when throughput or peak memory regresses
+against benchmarks/baseline.json.
+
+    python -m benchmarks.run                      # run and compare with the baseline
+    python -m benchmarks.run --update-baseline    # record new baseline numbers
+    python -m benchmarks.run --rows 1000 --rows 10000 --repeat 7
+
+Throughput is compared after dividing by a fixed pure-Python calibration
+workload timed in the same run, so a baseline recorded on one machine stays
+usable on a faster or slower one. Each benchmark loops until one sample takes
+at least --min-time seconds, and only pages with at least --gate-rows rows
+are gated; the fixture pages and the stand-in fetch are too small for
+their timings to mean much and are only reported. The allowed slowdown grows
+with the spread measured between samples.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import statistics
+import time
+import timeit
+import tracemalloc
+
+from .fixtures import fixture_kind, list_fixtures, load_fixture, synthesize_schedule_html
+from .stand_in_server import StandInScheduleServer
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+DEFAULT_SYNTHETIC_ROWS = (1000, 3000)
+DEFAULT_REPEAT = 3
+DEFAULT_TOLERANCE = 0.35
+DEFAULT_MIN_TIME = 0.2
+# Pages smaller than this are reported but never fail the run
+DEFAULT_GATE_ROWS = 1000
+# Allowed slowdown in multiples of the measured spread, when that is wider than the tolerance
+SPREAD_FACTOR = 3
+MAX_SLOWDOWN = 0.5
+
+def _calibration_workload():
+    total = 0
+    text = "프로그램 " * 50
+    for i in range(20000):
+        total += len(text[i % 40:]) + (i * 7) % 13
+    return total
+
+def calibration_rate(repeat, min_time=DEFAULT_MIN_TIME):
+    """Calibration runs per second (best of `repeat`), used to normalize throughput across machines."""
+    return 1.0 / _measure(_calibration_workload, repeat, min_time)[0]
+
+def _best_time(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def _measure(func, repeat, min_time):
+    """(best seconds per call, relative spread of the median over the best) from `repeat` samples of at least `min_time` each."""
+    timer = timeit.Timer(func)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time:
+            break
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9)) + 1)
+    samples = [elapsed] + timer.repeat(max(repeat - 1, 0), number)
+    per_call = [sample / number for sample in samples]
+    best = min(per_call)
+    return best, statistics.median(per_call) / best - 1
+
+def _peak_memory_kib(func):
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1024
+
+def _quiet(func):
+    """Wraps a pipeline call so its progress prints don't swamp the report."""
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return func()
+    return run
+
+def _wrap(schedule_data):
+    return {"data": [schedule_data]}
+
+def build_cases(synthetic_rows):
+    cases = [(f"{fixture_kind(name)}:{name}", load_fixture(name)) for name in list_fixtures()]
+    cases += [(f"synthetic:{rows}", synthesize_schedule_html(rows)) for rows in synthetic_rows]
+    return cases
+
+def stage_benchmarks(html_text, backends):
+    """(stage, callable) pairs for one page; every callable processes the whole page once."""
+    from kt_tvguide.emitters import generate_schedule_xml_string
+    from kt_tvguide.parse import parse_schedule_to_dict, parse_schedule_to_json
+
+    parsed = _quiet(lambda: parse_schedule_to_dict(html_text, "bench", "bench"))()
+    wrapper = _wrap(parsed)
+    stages = []
+    for backend in backends:
+        stages.append((f"parse_schedule_to_json[{backend}]",
+                       _quiet(lambda b=backend: parse_schedule_to_json(html_text, "bench", "bench", parser_backend=b))))
+        stages.append((f"parse_schedule_to_dict[{backend}]",
+                       _quiet(lambda b=backend: parse_schedule_to_dict(html_text, "bench", "bench", parser_backend=b))))
+    stages.append(("generate_schedule_xml_string", lambda: generate_schedule_xml_string(wrapper)))
+    stages.append(("json.dump", lambda: json.dump(wrapper, io.StringIO(), indent=2, ensure_ascii=False)))
+    return len(parsed.get('programs') or []), stages
+
+def fetch_benchmark(server, channel_ids, repeat):
+    """Times a concurrent fetch of `channel_ids` from the stand-in server."""
+    from kt_tvguide.fetch import create_http_session, fetch_schedules_concurrently
+
+    session = create_http_session()
+    fetch = _quiet(lambda: fetch_schedules_concurrently(channel_ids, [None], session=session, url=server.url))
+    pages = fetch()
+    if any(html_text is None for html_text in pages.values()):
+        raise RuntimeError(f"Stand-in server at {server.url} did not answer every fetch")
+    return _best_time(fetch, repeat)
+
+def run_benchmarks(synthetic_rows=DEFAULT_SYNTHETIC_ROWS, repeat=DEFAULT_REPEAT, backends=None, fetch_channels=8,
+                   min_time=DEFAULT_MIN_TIME):
+    from kt_tvguide.config import PARSER_BACKENDS
+
+    backends = backends or list(PARSER_BACKENDS)
+    calibration = calibration_rate(repeat, min_time)
+    results = {}
+    for case_name, html_text in build_cases(synthetic_rows):
+        rows, stages = stage_benchmarks(html_text, backends)
+        for stage_name, func in stages:
+            seconds, spread = _measure(func, repeat, min_time)
+            results[f"{case_name}/{stage_name}"] = {
+                'rows': rows,
+                'seconds': seconds,
+                'spread': spread,
+                'rows_per_sec': rows / seconds,
+                'normalized': rows / seconds / calibration,
+                'peak_kib': _peak_memory_kib(func),
+            }
+    if fetch_channels:
+        with StandInScheduleServer(synthetic_rows=30) as server:
+            seconds = fetch_benchmark(server, [str(ch) for ch in range(1, fetch_channels + 1)], repeat)
+        rows = 30 * fetch_channels
+        results[f"stand-in:{fetch_channels}ch/fetch_schedules_concurrently"] = {
+            'rows': rows,
+            'seconds': seconds,
+            'rows_per_sec': rows / seconds,
+            'normalized': rows / seconds / calibration,
+            'peak_kib': None,
+        }
+    return {'calibration_per_sec': calibration, 'results': results}
+
+def allowed_slowdown(current, previous, tolerance):
+    """Fraction of throughput a benchmark may lose: `tolerance`, or more when its samples were that noisy."""
+    spread = max(current.get('spread', 0), previous.get('spread', 0))
+    return max(tolerance, min(SPREAD_FACTOR * spread, MAX_SLOWDOWN))
+
+def find_regressions(report, baseline, tolerance, gate_rows=DEFAULT_GATE_ROWS):
+    """Names of gated benchmarks whose normalized throughput or peak memory is worse than baseline beyond the allowance."""
+    regressions = []
+    for name, current in report['results'].items():
+        previous = baseline.get('results', {}).get(name)
+        if previous is None or name.startswith('stand-in:') or current['rows'] < gate_rows:
+            continue
+        slowdown = allowed_slowdown(current, previous, tolerance)
+        if current['normalized'] < previous['normalized'] * (1 - slowdown):
+            regressions.append(f"{name}: throughput {current['normalized']:.3g} vs baseline {previous['normalized']:.3g}"
+                               f" (allowed -{slowdown:.0%})")
+        if current['peak_kib'] and previous.get('peak_kib') and current['peak_kib'] > previous['peak_kib'] * (1 + tolerance):
+            regressions.append(f"{name}: peak memory {current['peak_kib']:.0f} KiB vs baseline {previous['peak_kib']:.0f} KiB")
+    return regressions
+
+def print_report(report, baseline=None):
+    print(f"Calibration: {report['calibration_per_sec']:.1f} runs/sec")
+    print(f"{'benchmark':<78} {'rows':>6} {'rows/sec':>12} {'spread':>7} {'peak KiB':>10} {'vs base':>8}")
+    for name, result in report['results'].items():
+        previous = (baseline or {}).get('results', {}).get(name)
+        change = f"{result['normalized'] / previous['normalized'] - 1:+.0%}" if previous else "-"
+        peak = f"{result['peak_kib']:.0f}" if result['peak_kib'] is not None else "-"
+        spread = f"{result['spread']:.0%}" if 'spread' in result else "-"
+        print(f"{name:<78} {result['rows']:>6} {result['rows_per_sec']:>12,.0f} {spread:>7} {peak:>10} {change:>8}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.run')
+    parser.add_argument('--rows', type=int, action='append', help='Synthetic page size (repeatable)')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help='Samples per benchmark; the best is kept')
+    parser.add_argument('--min-time', type=float, default=DEFAULT_MIN_TIME, help='Minimum seconds per sample')
+    parser.add_argument('--backend', action='append', help='Parser backend to time (default: all)')
+    parser.add_argument('--fetch-channels', type=int, default=8, help='Channels fetched from the stand-in server (0 to skip)')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help='Allowed slowdown / memory growth as a fraction')
+    parser.add_argument('--gate-rows', type=int, default=DEFAULT_GATE_ROWS, help='Only gate pages with at least this many rows')
+    parser.add_argument('--update-baseline', action='store_true', help='Write the results as the new baseline')
+    parser.add_argument('--output', help='Also write the full report as JSON to this path')
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(tuple(args.rows or DEFAULT_SYNTHETIC_ROWS), args.repeat, args.backend, args.fetch_channels,
+                            args.min_time)
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    if baseline is None:
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one.")
+        return 0
+    regressions = find_regressions(report, baseline, args.tolerance, args.gate_rows)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""
+Compares the output serializers on realistic schedule sizes: one fixture
+channel-day, and multi-channel dumps built from synthetic pages. Prints the
+encode time (best of --repeat), output size and gzipped size for each, next
+to the stdlib json.dump(indent=2) the JSON output used to go through.
+
+    python -m benchmarks.serializers
+    python -m benchmarks.serializers --channels 300 --days 7
+"""
+import argparse
+import contextlib
+import gzip
+import io
+import json
+
+from kt_tvguide.emitters import generate_schedule_xml_string
+from kt_tvguide.pipeline import build_output_object
+from kt_tvguide.serializers import SERIALIZERS, orjson
+
+from .fixtures import list_fixtures, load_fixture, synthesize_schedule_html
+from .run import _best_time
+
+def _stdlib_indented(data):
+    return json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+
+def build_cases(channels, days, rows):
+    with contextlib.redirect_stdout(io.StringIO()):
+        fixture_day = build_output_object(load_fixture(list_fixtures()[-1]), '7', 'bench')[0]
+        pages = [
+            build_output_object(synthesize_schedule_html(rows, seed=index), str(index % channels + 1), 'bench')[0]
+            for index in range(min(channels * days, 64))
+        ]
+    dump = [pages[index % len(pages)] for index in range(channels * days)]
+    return [
+        ("fixture day", {"data": [fixture_day]}),
+        (f"{channels} ch x {days} d", {"data": dump}),
+    ]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.serializers')
+    parser.add_argument('--channels', type=int, default=50)
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--rows', type=int, default=60, help='Programs per synthetic channel-day')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    print(f"orjson: {'yes' if orjson else 'no (stdlib json)'}")
+    serializers = [('json.dump indent=2 (stdlib)', _stdlib_indented)]
+    serializers += list(SERIALIZERS.items())
+    serializers.append(('xml', lambda data: generate_schedule_xml_string(data).encode('utf-8')))
+    for case_name, data in build_cases(args.channels, args.days, args.rows):
+        programs = sum(len(entry.get('programs') or []) for entry in data['data'])
+        print(f"\n{case_name}: {len(data['data'])} channel-day(s), {programs} program(s)")
+        print(f"  {'format':<30} {'ms':>9} {'programs/s':>12} {'bytes':>11} {'gzip':>10}")
+        for name, func in serializers:
+            seconds = _best_time(lambda: func(data), args.repeat)
+            encoded = func(data)
+            print(f"  {name:<30} {seconds * 1000:>9.2f} {programs / seconds:>12,.0f} "
+                  f"{len(encoded):>11,} {len(gzip.compress(encoded, 6)):>10,}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+A local stand-in for tv.kt.com's pSchedule.asp so fetches can be exercised
+offline. It answers form POSTs with the fixture for the requested
+channel/date (or a synthetic page), EUC-KR encoded, with ETag /
+Last-Modified validators and 304s like the real server. pChList.asp lists
+the lineup (the fixture channels, or --lineup-size synthetic ones).
+
+Failure modes can be queued to reproduce upstream trouble: `fail_next(2,
+'status:503')` answers the next two requests with a 503; 'hang:<seconds>'
+stalls before answering normally (timeouts, hedging), 'reset' drops the
+connection without a response and 'truncate' cuts the body short.
+
+    python -m benchmarks.stand_in_server --port 8765
+    python -m benchmarks.stand_in_server --latency 0.3 --fail-mode status:503 --fail-count 5
+    KT_SCHEDULE_URL=http://127.0.0.1:8765/tv/channel/pSchedule.asp python -m kt_tvguide
+"""
+import argparse
+import hashlib
+import sys
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from .fixtures import FIXTURE_ENCODING, list_fixtures, load_fixture_bytes, synthesize_schedule_html
+
+SCHEDULE_PATH = '/tv/channel/pSchedule.asp'
+CHANNEL_LIST_PATH = '/tv/channel/pChList.asp'
+
+class _StandInHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients that timed out or hedged away hang up mid-response; that is expected here
+        if isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            return
+        super().handle_error(request, client_address)
+
+class StandInScheduleServer:
+    """Serves pSchedule.asp pages from fixtures on a background thread; usable as a context manager."""
+
+    def __init__(self, host='127.0.0.1', port=0, synthetic_rows=None, latency=0.0, lineup=None):
+        self.synthetic_rows = synthetic_rows
+        # Channel ids listed by the channel list page; any id gets a (synthetic) schedule either way
+        self.lineup = lineup if lineup is not None else sorted({name.split('_')[2] for name in list_fixtures()})
+        self.latency = latency
+        self.request_count = 0
+        self._failures = []
+        self._lock = threading.Lock()
+        self._page_cache = {}
+        self._last_modified = formatdate(usegmt=True)
+        self._httpd = _StandInHTTPServer((host, port), self._make_handler())
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}{SCHEDULE_PATH}"
+
+    @property
+    def channel_list_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}{CHANNEL_LIST_PATH}"
+
+    def channel_list_page(self):
+        options = ''.join(f'<option value="{channel_id}">Channel {channel_id}</option>' for channel_id in self.lineup)
+        return f'<html><body><select name="service_ch_no">{options}</select></body></html>'.encode(FIXTURE_ENCODING)
+
+    def fail_next(self, count, mode):
+        """Queues `mode` ('status:<code>', 'hang:<seconds>', 'reset' or 'truncate') for the next `count` requests."""
+        with self._lock:
+            self._failures.extend([mode] * count)
+
+    def clear_failures(self):
+        with self._lock:
+            self._failures = []
+
+    def _next_failure(self):
+        with self._lock:
+            self.request_count += 1
+            return self._failures.pop(0) if self._failures else None
+
+    def page_for(self, channel_id, date_str_yyyymmdd):
+        """EUC-KR bytes for a channel/date: an exact fixture, any fixture for the channel, or a synthetic page."""
+        cache_key = (channel_id, date_str_yyyymmdd)
+        page = self._page_cache.get(cache_key)
+        if page is not None:
+            return page
+        if self.synthetic_rows is None:
+            fixtures = list_fixtures()
+            exact = f"kt_pschedule_{channel_id}_{date_str_yyyymmdd}.html"
+            same_channel = [name for name in fixtures if name.startswith(f"kt_pschedule_{channel_id}_")]
+            if exact in fixtures:
+                page = load_fixture_bytes(exact)
+            elif same_channel:
+                page = load_fixture_bytes(same_channel[-1])
+        if page is None:
+            seed = int(hashlib.sha256(f"{channel_id}/{date_str_yyyymmdd}".encode()).hexdigest()[:8], 16)
+            page = synthesize_schedule_html(self.synthetic_rows or 30, seed=seed).encode(FIXTURE_ENCODING)
+        self._page_cache[cache_key] = page
+        return page
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                failure = server._next_failure()
+                if server.latency:
+                    time.sleep(server.latency)
+                if failure and failure.startswith('hang:'):
+                    time.sleep(float(failure.split(':', 1)[1]))
+                    failure = None
+                if failure == 'reset':
+                    self.close_connection = True
+                    return
+                if failure and failure.startswith('status:'):
+                    status = int(failure.split(':', 1)[1])
+                    body = f"<html><body>stand-in failure {status}</body></html>".encode(FIXTURE_ENCODING)
+                    self.send_response(status)
+                    if status in (429, 503):
+                        self.send_header('Retry-After', '0')
+                    self.send_header('Content-Type', f"text/html; charset={FIXTURE_ENCODING}")
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+                path = self.path.split('?', 1)[0]
+                if path == CHANNEL_LIST_PATH:
+                    page = server.channel_list_page()
+                    self.send_response(200)
+                    self.send_header('Content-Type', f"text/html; charset={FIXTURE_ENCODING}")
+                    self.send_header('Content-Length', str(len(page)))
+                    self.end_headers()
+                    self.wfile.write(page)
+                    return
+                if path != SCHEDULE_PATH:
+                    self.send_error(404)
+                    return
+                length = int(self.headers.get('Content-Length') or 0)
+                form = parse_qs(self.rfile.read(length).decode('utf-8'))
+                channel_id = form.get('service_ch_no', [''])[0]
+                date_str = form.get('seldate', [''])[0]
+                if not channel_id:
+                    self.send_error(400, "service_ch_no is required")
+                    return
+                page = server.page_for(channel_id, date_str)
+                etag = '"' + hashlib.sha256(page).hexdigest()[:16] + '"'
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', f"text/html; charset={FIXTURE_ENCODING}")
+                self.send_header('Content-Length', str(len(page)))
+                self.send_header('ETag', etag)
+                self.send_header('Last-Modified', server._last_modified)
+                self.end_headers()
+                if failure == 'truncate':
+                    self.wfile.write(page[:len(page) // 2])
+                    self.close_connection = True
+                    return
+                self.wfile.write(page)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.stand_in_server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--synthetic-rows', type=int, help='Serve synthetic pages of this size instead of fixtures')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds to wait before every response')
+    parser.add_argument('--fail-mode', help="Failure for the first --fail-count requests, e.g. status:503, hang:20, reset")
+    parser.add_argument('--fail-count', type=int, default=1)
+    parser.add_argument('--lineup-size', type=int, help='List channels 1..N on the channel list page')
+    args = parser.parse_args(argv)
+    lineup = [str(n) for n in range(1, args.lineup_size + 1)] if args.lineup_size else None
+    server = StandInScheduleServer(args.host, args.port, args.synthetic_rows, args.latency, lineup)
+    if args.fail_mode:
+        server.fail_next(args.fail_count, args.fail_mode)
+    print(f"Stand-in pSchedule.asp listening on {server.url} (Ctrl+C to stop)")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+if __name__ == "__main__":
+    main()
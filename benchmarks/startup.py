@@ -0,0 +1,97 @@
+"""
+Startup check for the scraper scripts, based on `python -X importtime`: the
+import cost of each script, and a run against the stand-in server with a
+warm cache and CACHE_MAX_AGE set, which must finish without importing the
+HTTP client or the HTML parser. Exits non-zero on a violation or when an
+import goes over --budget-ms.
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --budget-ms 80 --repeat 5
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+from .stand_in_server import StandInScheduleServer
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = ('get_kt_schedule', 'get_kbs2_schedule')
+# Top-level packages the cache-only path must not load
+NETWORK_AND_PARSER_MODULES = ('requests', 'urllib3', 'bs4', 'soupsieve', 'charset_normalizer', 'idna')
+
+def parse_importtime(stderr):
+    """{module: (self_us, cumulative_us)} from `-X importtime` output, top-level imports only under their own name."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+def _run(args, env=None, cwd=REPO_ROOT):
+    full_env = dict(os.environ, PYTHONPATH=REPO_ROOT, **(env or {}))
+    return subprocess.run([sys.executable, '-X', 'importtime'] + args, cwd=cwd, env=full_env,
+                          capture_output=True, text=True, check=False)
+
+def measure_import(script, repeat):
+    """Best cumulative import time (ms) of one script, and the module table of that run."""
+    best = None
+    for _ in range(repeat):
+        modules = parse_importtime(_run(['-c', f"import {script}"]).stderr)
+        elapsed_ms = modules[script][1] / 1000
+        if best is None or elapsed_ms < best[0]:
+            best = (elapsed_ms, modules)
+    return best
+
+def check_cache_only_run(script):
+    """Runs the script twice against the stand-in server; the second, fresh-cache run must not load the network/parser stacks."""
+    with StandInScheduleServer() as server, tempfile.TemporaryDirectory() as work_dir:
+        env = {
+            'KT_SCHEDULE_URL': server.url,
+            'SCHEDULE_CACHE_DIR': os.path.join(work_dir, 'cache'),
+            'OUTPUT_FORMATS': '',
+            'METRICS_REPORT_PATH': '',
+        }
+        warm = _run([os.path.join(REPO_ROOT, f"{script}.py")], env=env, cwd=work_dir)
+        if warm.returncode != 0:
+            return False, f"warm-up run failed:\n{warm.stderr[-2000:]}"
+        fresh = _run([os.path.join(REPO_ROOT, f"{script}.py")], env=dict(env, CACHE_MAX_AGE='3600'), cwd=work_dir)
+        if fresh.returncode != 0:
+            return False, f"cache-only run failed:\n{fresh.stderr[-2000:]}"
+    loaded = sorted(name for name in parse_importtime(fresh.stderr) if name.split('.')[0] in NETWORK_AND_PARSER_MODULES)
+    top_level = sorted({name.split('.')[0] for name in loaded})
+    if top_level:
+        return False, f"cache-only run imported {', '.join(top_level)}"
+    if 'fetching 0' not in fresh.stdout:
+        return False, "cache-only run still fetched"
+    return True, "cache-only run skipped the network and parser stacks"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.startup')
+    parser.add_argument('--budget-ms', type=float, default=120.0, help='Fail when a script takes longer than this to import')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--top', type=int, default=8, help='Slowest imports to list per script')
+    args = parser.parse_args(argv)
+
+    failures = 0
+    for script in SCRIPTS:
+        elapsed_ms, modules = measure_import(script, args.repeat)
+        within_budget = elapsed_ms <= args.budget_ms
+        failures += not within_budget
+        print(f"{script}: {elapsed_ms:.1f} ms to import (budget {args.budget_ms:.0f} ms) {'PASS' if within_budget else 'FAIL'}")
+        for name, (self_us, cumulative_us) in sorted(modules.items(), key=lambda item: -item[1][0])[:args.top]:
+            print(f"  {name:<40} self {self_us / 1000:>7.1f} ms  cumulative {cumulative_us / 1000:>7.1f} ms")
+        eager = sorted({name.split('.')[0] for name in modules if name.split('.')[0] in NETWORK_AND_PARSER_MODULES})
+        if eager:
+            failures += 1
+            print(f"  FAIL: importing the script loads {', '.join(eager)}")
+        ok, detail = check_cache_only_run(script)
+        failures += not ok
+        print(f"  {'PASS' if ok else 'FAIL'}: {detail}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
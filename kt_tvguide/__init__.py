@@ -0,0 +1,55 @@
+"""Core package for the KT TV guide scrapers: fetch -> parse -> emit."""
+import importlib
+
+# Public names and the submodule defining each. Resolved on first access so that
+# `python -m kt_tvguide.<module>` does not import that module twice.
+_EXPORTS = {
+    'KST_TIMEZONE': 'config',
+    'bulk_parse': 'bulk',
+    'TokenBucket': 'crawl',
+    'crawl_lineup': 'crawl',
+    'ScheduleDaemon': 'daemon',
+    'ChangelogEmitter': 'diff',
+    'diff_schedules': 'diff',
+    'EMITTERS': 'emitters',
+    'JsonEmitter': 'emitters',
+    'MsgpackEmitter': 'emitters',
+    'NdjsonEmitter': 'emitters',
+    'XmlEmitter': 'emitters',
+    'build_emitters': 'emitters',
+    'generate_schedule_xml_string': 'emitters',
+    'write_schedule_xml': 'emitters',
+    'FetchPolicy': 'fetch',
+    'create_http_session': 'fetch',
+    'fetch_schedule_html_post': 'fetch',
+    'fetch_schedules_concurrently': 'fetch',
+    'LAYOUTS': 'layouts',
+    'RUN_METRICS': 'metrics',
+    'write_run_report': 'metrics',
+    'parse_schedule_to_dict': 'parse',
+    'parse_schedule_to_json': 'parse',
+    'parse_schedule_to_records': 'parse',
+    'NowNextEmitter': 'payloads',
+    'WindowEmitter': 'payloads',
+    'layout_payload_bytes': 'payloads',
+    'build_output_object': 'pipeline',
+    'main': 'pipeline',
+    'run_pipeline': 'pipeline',
+    'ChannelDaySchedule': 'records',
+    'ProgramRecord': 'records',
+    'SERIALIZERS': 'serializers',
+    'PayloadCache': 'server',
+    'ScheduleAPIServer': 'server',
+    'ScheduleStore': 'store',
+    'StoreEmitter': 'store',
+    'XmltvEmitter': 'xmltv',
+}
+
+__all__ = sorted(_EXPORTS)
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,180 @@
+"""
+Bulk re-parse of saved HTML responses (a directory, .zip or .tar[.gz]) across
+CPU cores, for backfills. Pages are read in the main process, parsed in
+chunks on a process pool, and handed to the emitters in input order.
+
+    python -m kt_tvguide.bulk .schedule_cache --output-dir backfill
+    OUTPUT_FORMATS=xmltv,sqlite python -m kt_tvguide.bulk history.tar.gz --workers 8
+
+File names must contain "<channel>_<YYYYMMDD>", as in the schedule cache
+(7_20250601_4.html) or the benchmark fixtures (kt_pschedule_7_20250601.html).
+"""
+import argparse
+import os
+import re
+import tarfile
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from .config import BULK_CHUNK_SIZE, BULK_MAX_WORKERS, OUTPUT_FORMATS, PARSER_BACKEND
+from .emitters import build_emitters, output_filename_for
+from .metrics import RUN_METRICS, print_stage_summary, write_run_report
+from .pipeline import build_output_object, requested_date_context
+from .records import ChannelDaySchedule
+
+HTML_EXTENSIONS = ('.html', '.htm')
+_CHANNEL_DATE_PATTERN = re.compile(r'(\d+)_(\d{8})')
+
+def channel_and_date(name):
+    """(channel_id, YYYYMMDD) from a page's file name, or None."""
+    match = _CHANNEL_DATE_PATTERN.search(os.path.basename(name))
+    return (match.group(1), match.group(2)) if match else None
+
+def _source_order(name):
+    found = channel_and_date(name)
+    return (0, int(found[0]), found[1], name) if found else (1, 0, '', name)
+
+def iter_html_sources(source):
+    """
+    (name, raw bytes) for each HTML page under `source`. Directories and zip
+    files are read in (channel, date) order; tar archives in one sequential
+    pass, in archive order.
+    """
+    if os.path.isdir(source):
+        paths = [
+            os.path.join(root, filename)
+            for root, _, filenames in os.walk(source)
+            for filename in filenames if filename.lower().endswith(HTML_EXTENSIONS)
+        ]
+        for path in sorted(paths, key=_source_order):
+            with open(path, 'rb') as f:
+                yield path, f.read()
+    elif zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            names = [name for name in archive.namelist() if name.lower().endswith(HTML_EXTENSIONS)]
+            for name in sorted(names, key=_source_order):
+                yield name, archive.read(name)
+    elif tarfile.is_tarfile(source):
+        with tarfile.open(source, 'r|*') as archive:
+            for member in archive:
+                if member.isfile() and member.name.lower().endswith(HTML_EXTENSIONS):
+                    yield member.name, archive.extractfile(member).read()
+    else:
+        raise ValueError(f"{source} is not a directory, zip or tar archive")
+
+def decode_html_bytes(raw):
+    """Cached pages are stored as UTF-8, raw responses as EUC-KR."""
+    try:
+        return raw.decode('utf-8')
+    except UnicodeDecodeError:
+        return raw.decode('euc-kr', errors='replace')
+
+def _parse_chunk(chunk, parser_backend):
+    # Runs in a worker process: one work unit of (channel_id, date, raw bytes). Results travel back
+    # and wait in the in-order window as compact ChannelDaySchedules rather than nested dicts
+    results = []
+    for channel_id, date_str, raw in chunk:
+        schedule_object, is_error = build_output_object(
+            decode_html_bytes(raw), channel_id, requested_date_context(date_str, date_str), parser_backend=parser_backend
+        )
+        results.append((ChannelDaySchedule.from_dict(schedule_object), is_error))
+    return results
+
+def _iter_chunks(pages, chunk_size):
+    chunk = []
+    for page in pages:
+        chunk.append(page)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def parse_pages_in_order(pages, max_workers=BULK_MAX_WORKERS, chunk_size=BULK_CHUNK_SIZE, parser_backend=PARSER_BACKEND):
+    """
+    Parses (channel_id, date, raw bytes) tuples in chunks on a process pool,
+    yielding (channel_id, date, ChannelDaySchedule, is_error) in input order. At most two
+    chunks per worker are in flight, so memory stays bounded on large archives.
+    """
+    if max_workers <= 1:
+        for chunk in _iter_chunks(pages, chunk_size):
+            for (channel_id, date_str, _), (schedule_object, is_error) in zip(chunk, _parse_chunk(chunk, parser_backend)):
+                yield channel_id, date_str, schedule_object, is_error
+        return
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        in_flight = deque()
+        chunks = _iter_chunks(pages, chunk_size)
+        for chunk in chunks:
+            in_flight.append((chunk, executor.submit(_parse_chunk, chunk, parser_backend)))
+            if len(in_flight) < max_workers * 2:
+                continue
+            # Window is full: hand back the oldest chunk before reading more input
+            done_chunk, future = in_flight.popleft()
+            for (channel_id, date_str, _), (schedule_object, is_error) in zip(done_chunk, future.result()):
+                yield channel_id, date_str, schedule_object, is_error
+        while in_flight:
+            done_chunk, future = in_flight.popleft()
+            for (channel_id, date_str, _), (schedule_object, is_error) in zip(done_chunk, future.result()):
+                yield channel_id, date_str, schedule_object, is_error
+
+def bulk_parse(source, emitters, output_dir='.', max_workers=BULK_MAX_WORKERS, chunk_size=BULK_CHUNK_SIZE,
+               parser_backend=PARSER_BACKEND):
+    """
+    Re-parses every page under `source` and writes it through the emitters:
+    per-file ones into `output_dir` (tv_schedule_7_20250601.json, ...),
+    aggregate ones once for the whole source. Returns the number of pages.
+    """
+    RUN_METRICS.reset()
+    file_emitters = [e for e in emitters if not e.aggregate]
+    aggregate_emitters = [e for e in emitters if e.aggregate]
+
+    def pages():
+        for name, raw in iter_html_sources(source):
+            found = channel_and_date(name)
+            if found is None:
+                print(f"Skipping {name}: no <channel>_<YYYYMMDD> in the file name")
+                continue
+            RUN_METRICS.incr('fetch_bytes_total', len(raw))
+            yield found[0], found[1], raw
+
+    print(f"--- Bulk parse of {source} on {max_workers} worker(s), {chunk_size} page(s) per work unit ---")
+    os.makedirs(output_dir, exist_ok=True)
+    for emitter in aggregate_emitters:
+        emitter.open()
+    count = 0
+    with RUN_METRICS.time_stage('bulk_parse'):
+        for channel_id, date_str, schedule, is_error in parse_pages_in_order(pages(), max_workers, chunk_size, parser_backend):
+            count += 1
+            if is_error:
+                RUN_METRICS.incr('parse_errors_total')
+            else:
+                RUN_METRICS.incr('rows_parsed_total', len(schedule.programs or []))
+            schedule_object = schedule.to_dict()
+            for emitter in file_emitters:
+                base_filename = emitter.error_filename if is_error else emitter.output_filename
+                filename = os.path.join(output_dir, output_filename_for(os.path.basename(base_filename), channel_id, date_str, False))
+                with RUN_METRICS.time_stage('emit', emitter=emitter.name):
+                    emitter.emit({"data": [schedule_object]}, filename)
+            for emitter in aggregate_emitters:
+                with RUN_METRICS.time_stage('emit', emitter=emitter.name):
+                    emitter.add(schedule_object)
+    for emitter in aggregate_emitters:
+        with RUN_METRICS.time_stage('emit', emitter=emitter.name):
+            emitter.close()
+    print(f"\n--- Bulk parse complete: {count} page(s) ---")
+    print_stage_summary()
+    write_run_report()
+    return count
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m kt_tvguide.bulk', description='Re-parse saved HTML responses in parallel.')
+    parser.add_argument('source', help='Directory, .zip or .tar[.gz] of HTML pages')
+    parser.add_argument('--output-dir', default='.')
+    parser.add_argument('--workers', type=int, default=BULK_MAX_WORKERS)
+    parser.add_argument('--chunk-size', type=int, default=BULK_CHUNK_SIZE, help='Pages per work unit sent to a worker')
+    args = parser.parse_args(argv)
+    bulk_parse(args.source, build_emitters(OUTPUT_FORMATS or ['json']), args.output_dir, args.workers, args.chunk_size)
+
+if __name__ == "__main__":
+    main()
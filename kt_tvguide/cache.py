@@ -0,0 +1,108 @@
+"""On-disk cache of raw schedule HTML, keyed by channel/date/ch_type, with a content hash."""
+import hashlib
+import json
+import os
+import re
+import time
+
+from .config import DEFAULT_CHANNEL_TYPE, SCHEDULE_CACHE_DIR
+
+# The on-air badge moves between rows during the day; it is left out of the
+# hash so that only real schedule changes force a re-parse.
+_ON_AIR_BADGE_PATTERN = re.compile(r'<strong[^>]*class="[^"]*\bonline\b[^"]*"[^>]*>.*?</strong>', re.IGNORECASE | re.DOTALL)
+
+def content_hash(html_text):
+    """sha256 of the schedule HTML with the on-air badge removed."""
+    normalized = _ON_AIR_BADGE_PATTERN.sub('', html_text)
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+def channel_key(schedule_object):
+    """
+    The channel a schedule object belongs to across ch_types, for outputs that
+    merge channels (XMLTV ids, the store, change-log snapshots): the bare
+    channel id for the default ch_type, so existing ids keep working, and
+    "<ch_type>.<channel_id>" for any other.
+    """
+    channel_id = schedule_object.get('channel_id_requested', '')
+    channel_type = schedule_object.get('channel_type', DEFAULT_CHANNEL_TYPE)
+    if channel_type == DEFAULT_CHANNEL_TYPE:
+        return channel_id
+    return f"{channel_type}.{channel_id}"
+
+class ScheduleCache:
+    """
+    Stores, per key, the raw HTML (<key>.html) and a metadata file (<key>.json)
+    holding the content hash, the HTTP validators and the last parsed schedule.
+    """
+
+    def __init__(self, cache_dir=SCHEDULE_CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    @staticmethod
+    def key_for(channel_id, date_str_yyyymmdd, channel_type):
+        return f"{channel_id}_{date_str_yyyymmdd}_{channel_type}"
+
+    def _path(self, key, ext):
+        return os.path.join(self.cache_dir, f"{key}{ext}")
+
+    def load(self, key):
+        try:
+            with open(self._path(key, '.json'), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return None
+
+    def cached_html(self, key):
+        try:
+            with open(self._path(key, '.html'), 'r', encoding='utf-8') as f:
+                return f.read()
+        except (IOError, ValueError):
+            return None
+
+    def age_seconds(self, key):
+        """Seconds since the page was last fetched or confirmed unchanged, or None if it is not cached."""
+        try:
+            return time.time() - os.path.getmtime(self._path(key, '.html'))
+        except OSError:
+            return None
+
+    def mark_fresh(self, key):
+        """Records that the server just confirmed the cached page (304 or content hash match)."""
+        try:
+            os.utime(self._path(key, '.html'))
+        except OSError:
+            pass
+
+    def conditional_headers(self, key):
+        """
+        If-None-Match / If-Modified-Since headers for the stored validators, if
+        any. None are sent when the cached HTML is gone, since a 304 would leave nothing to serve.
+        """
+        if not os.path.exists(self._path(key, '.html')):
+            return {}
+        entry = self.load(key) or {}
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def store(self, key, html_text, schedule_data, etag=None, last_modified=None):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self._path(key, '.html'), 'w', encoding='utf-8') as f:
+            f.write(html_text)
+        self.store_schedule(key, schedule_data, content_hash(html_text), etag, last_modified)
+
+    def store_schedule(self, key, schedule_data, sha256, etag=None, last_modified=None):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry = {
+            'sha256': sha256,
+            'etag': etag,
+            'last_modified': last_modified,
+            'schedule': schedule_data,
+        }
+        tmp_path = self._path(key, '.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, self._path(key, '.json'))
@@ -0,0 +1,98 @@
+"""Shared configuration, read from environment variables with script defaults."""
+import os
+from datetime import timezone, timedelta
+
+DEFAULT_CHANNEL_ID = os.environ.get('TV_CHANNEL_ID', '7')
+# Comma-separated list of channels to fetch in one run (falls back to TV_CHANNEL_ID)
+CHANNEL_IDS = [c.strip() for c in os.environ.get('TV_CHANNEL_IDS', DEFAULT_CHANNEL_ID).split(',') if c.strip()]
+# Number of days to fetch starting from the current KST day (1 = today only, server default)
+FETCH_DAYS = int(os.environ.get('FETCH_DAYS', '1'))
+FETCH_MAX_WORKERS = int(os.environ.get('FETCH_MAX_WORKERS', '8'))
+MAX_REQUESTS_PER_HOST = int(os.environ.get('MAX_REQUESTS_PER_HOST', '4'))
+# Per-attempt connect / read timeouts (seconds); FETCH_DEADLINE bounds a fetch including retries
+FETCH_CONNECT_TIMEOUT = float(os.environ.get('FETCH_CONNECT_TIMEOUT', '3.05'))
+FETCH_READ_TIMEOUT = float(os.environ.get('FETCH_READ_TIMEOUT', '10'))
+FETCH_DEADLINE = float(os.environ.get('FETCH_DEADLINE', '30'))
+# Retries on timeouts, connection errors and 429/5xx with jittered exponential backoff
+FETCH_MAX_RETRIES = int(os.environ.get('FETCH_MAX_RETRIES', '2'))
+FETCH_BACKOFF_BASE = float(os.environ.get('FETCH_BACKOFF_BASE', '0.5'))
+FETCH_BACKOFF_MAX = float(os.environ.get('FETCH_BACKOFF_MAX', '8'))
+# Send a duplicate request when the first has not answered after this many seconds (0 disables)
+FETCH_HEDGE_AFTER = float(os.environ.get('FETCH_HEDGE_AFTER', '0'))
+# Serve the last good cached schedule (is_on_air recomputed) when the fetch fails
+SERVE_STALE_ON_FETCH_ERROR = os.environ.get('SERVE_STALE_ON_FETCH_ERROR', '1').lower() not in ('0', 'false', 'no')
+
+# Program title extraction: "fast" reads the original tree in one pass, "soup" re-parses each row (legacy)
+PARSER_BACKEND = os.environ.get('PARSER_BACKEND', 'fast')
+PARSER_BACKENDS = ('fast', 'soup')
+
+OUTPUT_JSON_FILENAME = os.environ.get('OUTPUT_FILENAME', 'tv_schedule.json')
+OUTPUT_XML_FILENAME = os.environ.get('OUTPUT_XML_FILENAME', 'tv_schedule.xml')
+OUTPUT_NDJSON_FILENAME = os.environ.get('OUTPUT_NDJSON_FILENAME', 'tv_schedule.ndjson')
+OUTPUT_MSGPACK_FILENAME = os.environ.get('OUTPUT_MSGPACK_FILENAME', 'tv_schedule.msgpack')
+# Change log of added/removed/retimed/retitled programs, and the per channel-day snapshots it is diffed against
+OUTPUT_CHANGELOG_FILENAME = os.environ.get('OUTPUT_CHANGELOG_FILENAME', 'tv_changes.ndjson')
+CHANGELOG_SNAPSHOT_DIR = os.environ.get('CHANGELOG_SNAPSHOT_DIR', '.changelog_snapshots')
+# Indentation of the json output; 0 writes compact JSON
+JSON_INDENT = int(os.environ.get('JSON_INDENT', '2'))
+OUTPUT_XMLTV_FILENAME = os.environ.get('OUTPUT_XMLTV_FILENAME', 'tv_guide.xmltv')
+XMLTV_CHANNEL_ID_SUFFIX = os.environ.get('XMLTV_CHANNEL_ID_SUFFIX', '.tv.kt.com')
+SCHEDULE_STORE_PATH = os.environ.get('SCHEDULE_STORE_PATH', 'schedule_store.sqlite3')
+OUTPUT_NOW_NEXT_FILENAME = os.environ.get('OUTPUT_NOW_NEXT_FILENAME', 'tv_now_next.json')
+OUTPUT_WINDOW_FILENAME = os.environ.get('OUTPUT_WINDOW_FILENAME', 'tv_window.json')
+# Per-layout payloads carry enough programs to stay correct this long (default: the 30-min cron interval)
+LAYOUT_PAYLOAD_HORIZON = int(os.environ.get('LAYOUT_PAYLOAD_HORIZON', '1800'))
+LAYOUT_PAYLOAD_GZIP = os.environ.get('LAYOUT_PAYLOAD_GZIP', '').lower() in ('1', 'true', 'yes')
+# Comma-separated emitter names; empty means the entry point's own default
+OUTPUT_FORMATS = [f.strip() for f in os.environ.get('OUTPUT_FORMATS', '').split(',') if f.strip()]
+
+# Raw HTML + parsed schedule cache; set to an empty string to disable
+SCHEDULE_CACHE_DIR = os.environ.get('SCHEDULE_CACHE_DIR', '.schedule_cache')
+# Seconds a cached page counts as current without asking the server (its last fetch, 304 or hash match);
+# a run whose pages are all that fresh never loads the HTTP client or the HTML parser. 0 always revalidates
+CACHE_MAX_AGE = int(os.environ.get('CACHE_MAX_AGE', '0'))
+
+# Run report with stage timings and counters: 'jsonl' appends one line per run, 'prometheus' writes a textfile
+METRICS_REPORT_PATH = os.environ.get('METRICS_REPORT_PATH', '')
+METRICS_FORMAT = os.environ.get('METRICS_FORMAT', 'jsonl')
+METRICS_FORMATS = ('jsonl', 'prometheus')
+# Opt-in profiling of fetch and parse: comma-separated 'cprofile' and/or 'tracemalloc'
+PROFILE_HOOKS = [h.strip() for h in os.environ.get('PROFILE_HOOKS', '').split(',') if h.strip()]
+PROFILE_OUTPUT_DIR = os.environ.get('PROFILE_OUTPUT_DIR', 'profiles')
+
+# Resident mode (--daemon or DAEMON_MODE=1): per channel-day re-fetch intervals in seconds. Today's pages are
+# re-fetched every DAEMON_TODAY_REFRESH, future days every DAEMON_FUTURE_REFRESH, and pages around KST
+# midnight (within DAEMON_BOUNDARY_WINDOW) every DAEMON_BOUNDARY_REFRESH. is_on_air needs no network.
+DAEMON_MODE = os.environ.get('DAEMON_MODE', '0').lower() in ('1', 'true', 'yes')
+DAEMON_TODAY_REFRESH = int(os.environ.get('DAEMON_TODAY_REFRESH', '3600'))
+DAEMON_FUTURE_REFRESH = int(os.environ.get('DAEMON_FUTURE_REFRESH', '21600'))
+DAEMON_BOUNDARY_REFRESH = int(os.environ.get('DAEMON_BOUNDARY_REFRESH', '600'))
+DAEMON_BOUNDARY_WINDOW = int(os.environ.get('DAEMON_BOUNDARY_WINDOW', '2700'))
+DAEMON_ERROR_RETRY = int(os.environ.get('DAEMON_ERROR_RETRY', '300'))
+
+# Local schedule API (python -m kt_tvguide.server)
+API_HOST = os.environ.get('API_HOST', '127.0.0.1')
+API_PORT = int(os.environ.get('API_PORT', '8080'))
+
+# Whole-lineup crawl (python -m kt_tvguide.crawl): global request rate/burst, workers sharing one session,
+# and the ch_type values --discover reads channel lists for
+CRAWL_OUTPUT_DIR = os.environ.get('CRAWL_OUTPUT_DIR', 'crawl')
+CRAWL_RATE = float(os.environ.get('CRAWL_RATE', '5'))
+CRAWL_BURST = int(os.environ.get('CRAWL_BURST', '10'))
+CRAWL_MAX_WORKERS = int(os.environ.get('CRAWL_MAX_WORKERS', '8'))
+CRAWL_CHANNEL_TYPES = [t.strip() for t in os.environ.get('CRAWL_CHANNEL_TYPES', '4').split(',') if t.strip()]
+CRAWL_CHECKPOINT_EVERY = int(os.environ.get('CRAWL_CHECKPOINT_EVERY', '20'))
+
+# Bulk re-parse of saved pages (python -m kt_tvguide.bulk): process pool size and pages per work unit
+BULK_MAX_WORKERS = int(os.environ.get('BULK_MAX_WORKERS', str(os.cpu_count() or 1)))
+BULK_CHUNK_SIZE = int(os.environ.get('BULK_CHUNK_SIZE', '8'))
+
+DEFAULT_CHANNEL_TYPE = "4"
+DEFAULT_VIEW_TYPE = "1"
+
+# Overridable so runs can target a local stand-in server
+KT_SCHEDULE_URL = os.environ.get('KT_SCHEDULE_URL', "https://tv.kt.com/tv/channel/pSchedule.asp")
+KT_CHANNEL_LIST_URL = os.environ.get('KT_CHANNEL_LIST_URL', "https://tv.kt.com/tv/channel/pChList.asp")
+
+KST_OFFSET_HOURS = 9
+KST_TIMEZONE = timezone(timedelta(hours=KST_OFFSET_HOURS))
@@ -0,0 +1,351 @@
+"""
+Whole-lineup crawl: every channel of one or more KT channel types, for
+FETCH_DAYS days, through a single keep-alive session under a global
+token-bucket rate limit. Outputs are sharded per channel
+(<output dir>/<ch_type>/<channel_id>/...). Finished channel-days are
+recorded in a checkpoint so an interrupted crawl picks up where it stopped.
+
+    python -m kt_tvguide.crawl --discover                  # lineup from the channel list page
+    python -m kt_tvguide.crawl --channels lineup.csv       # lines of "ch_type,channel_id[,name]"
+"""
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+import requests
+
+from .cache import ScheduleCache
+from .config import (
+    CRAWL_BURST,
+    CRAWL_CHANNEL_TYPES,
+    CRAWL_CHECKPOINT_EVERY,
+    CRAWL_MAX_WORKERS,
+    CRAWL_OUTPUT_DIR,
+    CRAWL_RATE,
+    DEFAULT_VIEW_TYPE,
+    FETCH_DAYS,
+    KST_TIMEZONE,
+    KT_CHANNEL_LIST_URL,
+    KT_SCHEDULE_URL,
+    OUTPUT_FORMATS,
+    PARSER_BACKEND,
+    SCHEDULE_CACHE_DIR,
+)
+from .emitters import build_emitters, output_filename_for
+from .fetch import DEFAULT_FETCH_POLICY, create_http_session, fetch_schedule_html_post
+from .metrics import RUN_METRICS, dump_profiles, print_stage_summary, write_run_report
+from .pipeline import OrderedHandoff, resolve_fetched_page
+from .timeline import build_fetch_dates
+
+CHECKPOINT_FILENAME = '.crawl_checkpoint.json'
+LINEUP_FILENAME = 'lineup.csv'
+
+# Channel numbers on the lineup page: <option value="7">KBS2</option>, or service_ch_no / ch_no in links and JS calls
+_CHANNEL_OPTION_PATTERN = re.compile(r'<option[^>]*\bvalue\s*=\s*["\']?(\d+)["\']?[^>]*>([^<]*)', re.IGNORECASE)
+_CHANNEL_PARAM_PATTERN = re.compile(r'\b(?:service_ch_no|ch_no)\b\W{1,4}(\d+)', re.IGNORECASE)
+
+@dataclass(frozen=True)
+class LineupChannel:
+    channel_type: str
+    channel_id: str
+    name: str = ''
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second, holding at most
+    `capacity`. Callers reserve a token and sleep outside the lock until it is
+    due, so waiting threads are served in arrival order. rate <= 0 disables it.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = max(1.0, capacity if capacity is not None else rate)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Takes one token, blocking until it is available. Returns the seconds waited."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+        return wait
+
+class CrawlCheckpoint:
+    """The set of finished channel-day keys, saved atomically every `save_every` completions."""
+
+    def __init__(self, path, save_every=CRAWL_CHECKPOINT_EVERY):
+        self.path = path
+        self.save_every = max(1, save_every)
+        self.done = set()
+        self._unsaved = 0
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self.done = set(json.load(f).get('done', []))
+        except (IOError, ValueError):
+            pass
+
+    @staticmethod
+    def key_for(channel_type, channel_id, date_str_yyyymmdd):
+        return f"{channel_type}/{channel_id}/{date_str_yyyymmdd}"
+
+    def mark_done(self, key):
+        self.done.add(key)
+        self._unsaved += 1
+        if self._unsaved >= self.save_every:
+            self.save()
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'saved_at': datetime.now(timezone.utc).isoformat(), 'done': sorted(self.done)}, f)
+        os.replace(tmp_path, self.path)
+        self._unsaved = 0
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.done = set()
+        self._unsaved = 0
+
+def parse_channel_list(html, channel_type):
+    """Channels found on a lineup page, in page order, without duplicates."""
+    channels = {}
+    for channel_id, name in _CHANNEL_OPTION_PATTERN.findall(html):
+        channels.setdefault(channel_id, name.strip())
+    for channel_id in _CHANNEL_PARAM_PATTERN.findall(html):
+        channels.setdefault(channel_id, '')
+    return [LineupChannel(channel_type, channel_id, name) for channel_id, name in channels.items()]
+
+def discover_channels(channel_types=CRAWL_CHANNEL_TYPES, session=None, url=KT_CHANNEL_LIST_URL, policy=DEFAULT_FETCH_POLICY):
+    """
+    POSTs each ch_type to the channel list page and collects the channels it
+    links to. Each request takes a token from the policy's rate limiter, if any.
+    """
+    http = session if session is not None else requests
+    lineup = []
+    for channel_type in channel_types:
+        policy.wait_for_rate_limit()
+        try:
+            response = http.post(url, data={'ch_type': channel_type}, timeout=policy.timeout(policy.deadline))
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            print(f"Could not load the channel list for ch_type {channel_type}: {e}")
+            continue
+        response.encoding = 'euc-kr'
+        channels = parse_channel_list(response.text, channel_type)
+        print(f"ch_type {channel_type}: {len(channels)} channel(s)")
+        lineup.extend(channels)
+    return lineup
+
+def load_lineup(path, default_channel_type=CRAWL_CHANNEL_TYPES[0]):
+    """Reads "ch_type,channel_id[,name]" (or bare "channel_id") lines; '#' starts a comment."""
+    lineup = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            fields = [field.strip() for field in line.split(',', 2)]
+            if len(fields) == 1:
+                lineup.append(LineupChannel(default_channel_type, fields[0]))
+            else:
+                lineup.append(LineupChannel(fields[0], fields[1], fields[2] if len(fields) > 2 else ''))
+    return lineup
+
+def save_lineup(lineup, path):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        for channel in lineup:
+            fields = [channel.channel_type, channel.channel_id] + ([channel.name] if channel.name else [])
+            f.write(','.join(fields) + "\n")
+
+def shard_filename(output_dir, base_filename, channel, date_str_yyyymmdd):
+    """e.g. crawl/4/7/tv_schedule_7_20250601.json"""
+    shard_dir = os.path.join(output_dir, channel.channel_type, channel.channel_id)
+    return os.path.join(shard_dir, output_filename_for(os.path.basename(base_filename), channel.channel_id, date_str_yyyymmdd, False))
+
+def crawl_lineup(lineup, num_days, emitters, output_dir=CRAWL_OUTPUT_DIR, rate=CRAWL_RATE, burst=CRAWL_BURST,
+                 max_workers=CRAWL_MAX_WORKERS, resume=True, view_type_val=DEFAULT_VIEW_TYPE,
+                 parser_backend=PARSER_BACKEND, cache_dir=SCHEDULE_CACHE_DIR, url=KT_SCHEDULE_URL,
+                 policy=DEFAULT_FETCH_POLICY):
+    """
+    Fetches, parses and writes every channel x day of `lineup`. Per-file
+    emitters write into the channel's shard as each page arrives, unless the
+    programs are unchanged since the cached parse; aggregate
+    emitters (XMLTV, SQLite) receive the channel-days in lineup order. With
+    `resume`, channel-days finished by an earlier interrupted crawl are not
+    fetched again (aggregate emitters get them from the schedule cache).
+    Every HTTP attempt (retries and hedges too) takes a token from the
+    policy's rate limiter; without one, a TokenBucket(rate, burst) is used.
+    Returns the number of unfinished channel-days: those that failed and those
+    served from the stale cache. Neither is checkpointed, so a resumed crawl
+    fetches them again.
+    """
+    RUN_METRICS.reset()
+    now_kst = datetime.now(timezone.utc).astimezone(KST_TIMEZONE)
+    today_kst_str = now_kst.strftime('%Y%m%d')
+    dates = build_fetch_dates(num_days, now_kst)
+    jobs = [(channel, date_str) for channel in lineup for date_str in dates]
+    cache = ScheduleCache(cache_dir) if cache_dir else None
+    checkpoint = CrawlCheckpoint(os.path.join(output_dir, CHECKPOINT_FILENAME))
+    if not resume:
+        checkpoint.clear()
+    file_emitters = [e for e in emitters if not e.aggregate]
+    aggregate_emitters = [e for e in emitters if e.aggregate]
+
+    def job_key(job):
+        return CrawlCheckpoint.key_for(job[0].channel_type, job[0].channel_id, job[1] or today_kst_str)
+
+    def cache_key(job):
+        return ScheduleCache.key_for(job[0].channel_id, job[1] or today_kst_str, job[0].channel_type)
+
+    pending_jobs = [job for job in jobs if job_key(job) not in checkpoint.done]
+    print(f"--- Crawl of {len(lineup)} channel(s) x {len(dates)} day(s) at {rate:g} req/s "
+          f"(burst {burst}), {max_workers} worker(s) ---")
+    if len(pending_jobs) < len(jobs):
+        RUN_METRICS.incr('crawl_jobs_resumed_total', len(jobs) - len(pending_jobs))
+        print(f"Resuming: {len(jobs) - len(pending_jobs)} channel-day(s) already done, {len(pending_jobs)} to go.")
+
+    if policy.rate_limiter is None:
+        policy = policy.with_rate_limiter(TokenBucket(rate, burst))
+    session = create_http_session(pool_size=max_workers)
+
+    def fetch_job(job, conditional=True):
+        channel, date_str = job
+        response_meta = {}
+        extra_headers = cache.conditional_headers(cache_key(job)) if cache and conditional else None
+        html = fetch_schedule_html_post(channel.channel_id, date_str, channel.channel_type, view_type_val,
+                                        session=session, extra_headers=extra_headers,
+                                        response_meta=response_meta, url=url, policy=policy)
+        return html, response_meta
+
+    def add_to_aggregates(schedule_object):
+        if schedule_object is None:
+            return
+        for emitter in aggregate_emitters:
+            with RUN_METRICS.time_stage('emit', emitter=emitter.name):
+                emitter.add(schedule_object)
+
+    for emitter in aggregate_emitters:
+        emitter.open()
+    # Aggregate emitters expect each channel's days in order, so completions are held back until their turn
+    handoff = OrderedHandoff(jobs, add_to_aggregates)
+    failures = 0
+    stale_served = 0
+
+    for job in jobs:
+        if aggregate_emitters and job_key(job) in checkpoint.done:
+            entry = cache.load(cache_key(job)) if cache else None
+            schedule_object = entry.get('schedule') if entry else None
+            if schedule_object is not None:
+                schedule_object['channel_type'] = job[0].channel_type
+            handoff.complete(job, schedule_object)
+
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+    try:
+        futures = {executor.submit(fetch_job, job): job for job in pending_jobs}
+        for future in as_completed(futures):
+            job = futures[future]
+            channel, date_str = job
+            output_date_str = date_str or today_kst_str
+            try:
+                html, response_meta = future.result()
+            except Exception as e:
+                print(f"Unexpected error fetching channel {channel.channel_id} / date {date_str}: {e}")
+                html, response_meta = None, {}
+            ok_filenames = [shard_filename(output_dir, emitter.output_filename, channel, output_date_str)
+                            for emitter in file_emitters]
+            schedule_object, is_error, needs_writing = resolve_fetched_page(
+                cache, cache_key(job) if cache else None, html, response_meta, channel.channel_id, date_str,
+                today_kst_str, ok_filenames, parser_backend, refetch=lambda job=job: fetch_job(job, conditional=False)
+            )
+            # Channel ids repeat across ch_types; aggregate outputs key on both (cache.channel_key)
+            schedule_object['channel_type'] = channel.channel_type
+            if needs_writing:
+                for emitter in file_emitters:
+                    base_filename = emitter.error_filename if is_error else emitter.output_filename
+                    filename = shard_filename(output_dir, base_filename, channel, output_date_str)
+                    os.makedirs(os.path.dirname(filename), exist_ok=True)
+                    with RUN_METRICS.time_stage('emit', emitter=emitter.name):
+                        emitter.emit({"data": [schedule_object]}, filename)
+            elif not is_error:
+                RUN_METRICS.incr('crawl_shards_unchanged_total')
+            if is_error:
+                # Not checkpointed, so the next (resumed) crawl tries it again
+                failures += 1
+            elif html is None:
+                # A stale fallback is written but not checkpointed, so a resumed crawl refetches it
+                stale_served += 1
+            else:
+                checkpoint.mark_done(job_key(job))
+            if aggregate_emitters:
+                handoff.complete(job, None if is_error else schedule_object)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        session.close()
+        checkpoint.save()
+    for emitter in aggregate_emitters:
+        with RUN_METRICS.time_stage('emit', emitter=emitter.name):
+            emitter.close()
+
+    if failures == 0 and stale_served == 0:
+        checkpoint.clear()
+        print(f"\n--- Crawl complete: {len(jobs)} channel-day(s) in {output_dir} ---")
+    else:
+        print(f"\n--- Crawl finished with {failures} failed and {stale_served} stale-served channel-day(s); "
+              f"run again to retry just those ---")
+    print_stage_summary()
+    write_run_report()
+    dump_profiles()
+    return failures + stale_served
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m kt_tvguide.crawl', description='Crawl the whole KT channel lineup.')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--channels', help='Lineup file with "ch_type,channel_id[,name]" lines')
+    source.add_argument('--discover', action='store_true', help='Read the lineup from the channel list page')
+    parser.add_argument('--channel-types', default=','.join(CRAWL_CHANNEL_TYPES),
+                        help='ch_type values for --discover (default: %(default)s)')
+    parser.add_argument('--days', type=int, default=FETCH_DAYS)
+    parser.add_argument('--output-dir', default=CRAWL_OUTPUT_DIR)
+    parser.add_argument('--rate', type=float, default=CRAWL_RATE, help='Requests per second across all workers')
+    parser.add_argument('--burst', type=int, default=CRAWL_BURST)
+    parser.add_argument('--workers', type=int, default=CRAWL_MAX_WORKERS)
+    parser.add_argument('--no-resume', action='store_true', help='Ignore the checkpoint of an interrupted crawl')
+    parser.add_argument('--list-url', default=KT_CHANNEL_LIST_URL)
+    args = parser.parse_args(argv)
+
+    # One limiter for discovery and the crawl, so together they stay within --rate
+    policy = DEFAULT_FETCH_POLICY.with_rate_limiter(TokenBucket(args.rate, args.burst))
+    if args.discover:
+        channel_types = [t.strip() for t in args.channel_types.split(',') if t.strip()]
+        lineup = discover_channels(channel_types, url=args.list_url, policy=policy)
+        if not lineup:
+            print("No channels discovered; pass --channels with a lineup file instead.")
+            return 1
+        # Written out so later crawls (and edits by hand) can use --channels
+        save_lineup(lineup, os.path.join(args.output_dir, LINEUP_FILENAME))
+    else:
+        lineup = load_lineup(args.channels)
+    emitters = build_emitters(OUTPUT_FORMATS or ['json'])
+    unfinished = crawl_lineup(lineup, args.days, emitters, output_dir=args.output_dir, rate=args.rate,
+                              burst=args.burst, max_workers=args.workers, resume=not args.no_resume, policy=policy)
+    return 1 if unfinished else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
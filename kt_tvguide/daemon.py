@@ -0,0 +1,147 @@
+"""
+Resident mode: keeps the run's schedules in memory, re-fetches each
+channel-day on its own adaptive cadence and rewrites the outputs at program
+boundaries (is_on_air) without touching the network.
+"""
+import signal
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from .config import (
+    DAEMON_BOUNDARY_REFRESH,
+    DAEMON_BOUNDARY_WINDOW,
+    DAEMON_ERROR_RETRY,
+    DAEMON_FUTURE_REFRESH,
+    DAEMON_TODAY_REFRESH,
+    KST_TIMEZONE,
+)
+from .fetch import create_http_session
+from .pipeline import run_pipeline
+from .timeline import build_fetch_dates, next_boundary_epoch
+
+# Wake a moment after a program starts so the clock is unambiguously past the boundary
+BOUNDARY_WAKE_DELAY_SECONDS = 1
+
+def _kst_midnight_epochs(now_epoch):
+    """(start of the current KST day, start of the next one) as UTC epochs."""
+    now_kst = datetime.fromtimestamp(now_epoch, timezone.utc).astimezone(KST_TIMEZONE)
+    day_start = now_kst.replace(hour=0, minute=0, second=0, microsecond=0)
+    return int(day_start.timestamp()), int((day_start + timedelta(days=1)).timestamp())
+
+class ScheduleDaemon:
+    """
+    Drives run_pipeline in a loop. Each tick re-fetches only the channel-days
+    that are due and refreshes the rest from memory, then sleeps until the
+    next fetch, program boundary or KST midnight.
+    """
+
+    def __init__(self, channel_ids, num_days, emitters, today_refresh=DAEMON_TODAY_REFRESH,
+                 future_refresh=DAEMON_FUTURE_REFRESH, boundary_refresh=DAEMON_BOUNDARY_REFRESH,
+                 boundary_window=DAEMON_BOUNDARY_WINDOW, error_retry=DAEMON_ERROR_RETRY, **pipeline_kwargs):
+        self.channel_ids = channel_ids
+        self.num_days = num_days
+        self.emitters = emitters
+        self.today_refresh = today_refresh
+        self.future_refresh = future_refresh
+        self.boundary_refresh = boundary_refresh
+        self.boundary_window = boundary_window
+        self.error_retry = error_retry
+        # Refetches follow the daemon's own schedule, not the cache age
+        pipeline_kwargs.setdefault('cache_max_age', 0)
+        # The in-memory refresh between fetches and the API need every schedule of the last tick
+        pipeline_kwargs['keep_results'] = True
+        self.pipeline_kwargs = pipeline_kwargs
+        self.results = {}
+        self.next_fetch_at = {}
+        self._stop_event = threading.Event()
+
+    def current_jobs(self, now_epoch):
+        now_kst = datetime.fromtimestamp(now_epoch, timezone.utc).astimezone(KST_TIMEZONE)
+        dates = build_fetch_dates(self.num_days, now_kst)
+        return [(channel_id, date_str) for channel_id in self.channel_ids for date_str in dates]
+
+    def refresh_interval(self, job, is_error, now_epoch):
+        """
+        Seconds until the job's next fetch: soon after an error, often around
+        KST midnight (today's and tomorrow's pages change hands), hourly for the
+        rest of today and rarely for later days.
+        """
+        if is_error:
+            return self.error_retry
+        day_start, next_day_start = _kst_midnight_epochs(now_epoch)
+        date_str = job[1]
+        days_ahead = 0
+        if date_str:
+            job_day_start = int(datetime.strptime(date_str, '%Y%m%d').replace(tzinfo=KST_TIMEZONE).timestamp())
+            days_ahead = (job_day_start - day_start) // 86400
+        since_midnight = now_epoch - day_start
+        to_midnight = next_day_start - now_epoch
+        if days_ahead <= 0:
+            near_boundary = since_midnight <= self.boundary_window or to_midnight <= self.boundary_window
+        else:
+            near_boundary = days_ahead == 1 and to_midnight <= self.boundary_window
+        if near_boundary:
+            return self.boundary_refresh
+        return self.today_refresh if days_ahead <= 0 else self.future_refresh
+
+    def next_wake(self, now_epoch):
+        """Earliest of: a due fetch, the next program boundary of any schedule, the next KST midnight."""
+        candidates = list(self.next_fetch_at.values())
+        candidates.append(_kst_midnight_epochs(now_epoch)[1] + BOUNDARY_WAKE_DELAY_SECONDS)
+        for schedule_object, is_error in self.results.values():
+            if not is_error:
+                boundary = next_boundary_epoch(schedule_object, now_epoch)
+                if boundary is not None:
+                    candidates.append(boundary + BOUNDARY_WAKE_DELAY_SECONDS)
+        return max(now_epoch + 1, min(candidates))
+
+    def tick(self, now_epoch=None):
+        """One pass: fetch the due channel-days, refresh everything else from memory."""
+        now_epoch = int(time.time()) if now_epoch is None else now_epoch
+        jobs = self.current_jobs(now_epoch)
+        due = {job for job in jobs if self.next_fetch_at.get(job, 0) <= now_epoch or job not in self.results}
+        previous_results = {job: self.results[job] for job in jobs if job in self.results}
+        self.results = run_pipeline(
+            self.channel_ids, self.num_days, self.emitters,
+            refetch_jobs=due, previous_results=previous_results, **self.pipeline_kwargs
+        )
+        _, next_day_start = _kst_midnight_epochs(now_epoch)
+        self.next_fetch_at = {job: at for job, at in self.next_fetch_at.items() if job in self.results}
+        for job in due:
+            if job not in self.results:
+                continue
+            next_at = now_epoch + self.refresh_interval(job, self.results[job][1], now_epoch)
+            if job[1] is None:
+                # The server-default "current day" page turns into a different day at midnight
+                next_at = min(next_at, next_day_start + BOUNDARY_WAKE_DELAY_SECONDS)
+            self.next_fetch_at[job] = next_at
+        return due
+
+    def run_forever(self):
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda signum, frame: self.stop())
+        owns_session = 'session' not in self.pipeline_kwargs
+        if owns_session:
+            self.pipeline_kwargs['session'] = create_http_session()
+        print(f"--- Resident mode: {len(self.channel_ids)} channel(s) x {self.num_days} day(s) ---")
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    self.tick()
+                    wake_at = self.next_wake(int(time.time()))
+                except Exception as e:
+                    print(f"Resident mode tick failed: {e}. Retrying in {self.error_retry}s.")
+                    wake_at = time.time() + self.error_retry
+                wake_kst = datetime.fromtimestamp(wake_at, timezone.utc).astimezone(KST_TIMEZONE)
+                print(f"\n--- Sleeping until {wake_kst.strftime('%Y-%m-%d %H:%M:%S KST')} ---")
+                self._stop_event.wait(max(0, wake_at - time.time()))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if owns_session:
+                self.pipeline_kwargs.pop('session').close()
+            print("--- Resident mode stopped ---")
+
+    def stop(self):
+        self._stop_event.set()
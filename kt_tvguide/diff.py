@@ -0,0 +1,138 @@
+"""
+Structural diff between successive snapshots of a channel-day, keyed by
+channel, date and start time, and an emitter appending the changes to a
+change log so consumers can patch their copy instead of reloading whole days.
+"""
+import json
+import os
+from datetime import datetime, timezone
+
+from .cache import channel_key
+from .config import CHANGELOG_SNAPSHOT_DIR, OUTPUT_CHANGELOG_FILENAME
+from .metrics import RUN_METRICS
+from .serializers import dumps_json
+
+# Compared for each program; is_on_air moves with the clock and is not a change
+DIFFED_PROGRAM_KEYS = ('time', 'title', 'genre', 'icons')
+
+def _start_key(program):
+    return program.get('start_epoch_utc', program.get('time'))
+
+def _change_order(change):
+    # Epoch starts sort numerically; schedules that could not be annotated fall back to "HH:MM"
+    start = change['start']
+    return (0, start, '') if isinstance(start, int) else (1, 0, str(start))
+
+def snapshot_programs(schedule_object):
+    """The part of a schedule the diff looks at: each program's start key and DIFFED_PROGRAM_KEYS."""
+    return [
+        dict({key: program.get(key) for key in DIFFED_PROGRAM_KEYS}, start=_start_key(program))
+        for program in schedule_object.get('programs') or []
+    ]
+
+def diff_programs(previous, current):
+    """
+    Changes from `previous` to `current` (lists from snapshot_programs), in
+    start order. A program whose start is gone while the same title appears at
+    a new start is reported as retimed rather than removed + added.
+    Each change is {'change': added|removed|retimed|retitled|changed, ...program fields}.
+    """
+    previous_by_start = {program['start']: program for program in previous}
+    current_by_start = {program['start']: program for program in current}
+    changes = []
+    removed = [program for program in previous if program['start'] not in current_by_start]
+    added = [program for program in current if program['start'] not in previous_by_start]
+    for program in current:
+        before = previous_by_start.get(program['start'])
+        if before is None:
+            continue
+        if before['title'] != program['title']:
+            changes.append(dict(program, change='retitled', previous_title=before['title']))
+        else:
+            fields = {key: [before.get(key), program.get(key)] for key in DIFFED_PROGRAM_KEYS if before.get(key) != program.get(key)}
+            if fields:
+                changes.append(dict(program, change='changed', fields=fields))
+    for before in list(removed):
+        moved = next((program for program in added if program['title'] == before['title']), None)
+        if moved is None:
+            continue
+        removed.remove(before)
+        added.remove(moved)
+        changes.append(dict(moved, change='retimed', previous_start=before['start'], previous_time=before['time']))
+    changes += [dict(program, change='removed') for program in removed]
+    changes += [dict(program, change='added') for program in added]
+    changes.sort(key=_change_order)
+    return changes
+
+def diff_schedules(previous_object, current_object):
+    """diff_programs for two schedule objects (an absent previous one means everything was added)."""
+    return diff_programs(snapshot_programs(previous_object or {}), snapshot_programs(current_object))
+
+def schedule_unchanged(previous_object, current_object):
+    """True when a re-parsed channel-day has no program changes and the same on-air program, so outputs can stay."""
+    if not previous_object or 'error_summary' in previous_object or diff_schedules(previous_object, current_object):
+        return False
+    on_air = [program.get('is_on_air') for program in current_object.get('programs') or []]
+    return on_air == [program.get('is_on_air') for program in previous_object.get('programs') or []]
+
+class ChangelogEmitter:
+    """
+    Diffs each channel-day against its last snapshot (one small JSON file per
+    channel-day in CHANGELOG_SNAPSHOT_DIR) and appends one NDJSON line per
+    change to the change log. Days seen for the first time log every program
+    as added, so replaying the log from the start rebuilds the schedules.
+    """
+    name = 'changelog'
+    aggregate = True
+
+    def __init__(self, output_filename=OUTPUT_CHANGELOG_FILENAME, snapshot_dir=CHANGELOG_SNAPSHOT_DIR):
+        self.output_filename = output_filename
+        self.snapshot_dir = snapshot_dir
+        self._lines = []
+        self._snapshots = {}
+
+    def _snapshot_path(self, channel_id, date_str):
+        return os.path.join(self.snapshot_dir, f"{channel_id}_{date_str}.json")
+
+    def _load_snapshot(self, channel_id, date_str):
+        try:
+            with open(self._snapshot_path(channel_id, date_str), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return []
+
+    def open(self):
+        self._lines = []
+        self._snapshots = {}
+
+    def add(self, schedule_object):
+        if 'error_summary' in schedule_object:
+            return
+        channel_id = channel_key(schedule_object)
+        date_str = schedule_object.get('date_displayed')
+        current = snapshot_programs(schedule_object)
+        # A channel-day added earlier in this run is diffed against that pending snapshot, not the one on disk
+        previous = self._snapshots.get((channel_id, date_str))
+        if previous is None:
+            previous = self._load_snapshot(channel_id, date_str)
+        changes = diff_programs(previous, current)
+        if not changes:
+            return
+        run_iso = datetime.now(timezone.utc).isoformat()
+        for change in changes:
+            RUN_METRICS.incr('schedule_changes_total', change=change['change'])
+            self._lines.append(dumps_json(dict({'run_iso_utc': run_iso, 'channel_id': channel_id, 'date': date_str}, **change)) + b"\n")
+        self._snapshots[(channel_id, date_str)] = current
+
+    def close(self):
+        # Log first, snapshots second: a crash in between re-reports changes rather than losing them
+        if self._lines:
+            with open(self.output_filename, 'ab') as f:
+                f.writelines(self._lines)
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        for (channel_id, date_str), programs in self._snapshots.items():
+            path = self._snapshot_path(channel_id, date_str)
+            with open(f"{path}.tmp", 'wb') as f:
+                f.write(dumps_json(programs))
+            os.replace(f"{path}.tmp", path)
+        print(f"Change log {self.output_filename}: {len(self._lines)} change(s) in {len(self._snapshots)} channel-day(s)")
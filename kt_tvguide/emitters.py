@@ -0,0 +1,207 @@
+"""Output emitters. Each one writes the same {"data": [...]} structure in its own format."""
+import os
+
+from .config import JSON_INDENT, OUTPUT_JSON_FILENAME, OUTPUT_MSGPACK_FILENAME, OUTPUT_NDJSON_FILENAME, OUTPUT_XML_FILENAME
+from .diff import ChangelogEmitter
+from .payloads import NowNextEmitter, WindowEmitter
+from .serializers import dumps_json, dumps_msgpack, iter_ndjson_lines
+from .store import StoreEmitter
+from .xmltv import XmltvEmitter
+from .xmlutil import XML_DECLARATION, XML_INDENT, sanitize_xml_tag, xml_escape_text
+
+def output_filename_for(base_filename, channel_id, date_str_yyyymmdd, single_output):
+    """
+    Keeps the configured filename for the classic single channel/current day
+    run; otherwise writes one file per channel/day, e.g. tv_schedule_7_20250601.json.
+    """
+    if single_output:
+        return base_filename
+    stem, ext = os.path.splitext(base_filename)
+    return f"{stem}_{channel_id}_{date_str_yyyymmdd}{ext}"
+
+def _list_item_tag(list_tag, item_in_list):
+    if list_tag == "programs":
+        return "program"
+    if list_tag == "icons":
+        return "icon"
+    if list_tag == "data":
+        if isinstance(item_in_list, dict):
+            return "error_entry" if "error_summary" in item_in_list else "schedule_entry"
+        return "entry"
+    return "item"
+
+def _iter_xml_element(data, key_as_tag_name, depth):
+    """
+    Yields the pretty-printed XML for one Python value, chunk by chunk.
+    - data: The Python data to convert (dict, list, str, int, etc.).
+    - key_as_tag_name: The desired tag name for the current data element.
+    - depth: Nesting level, used for indentation.
+    """
+    sane_tag = sanitize_xml_tag(key_as_tag_name)
+    indent = XML_INDENT * depth
+    if isinstance(data, (dict, list)):
+        if not data:
+            yield f"{indent}<{sane_tag}/>\n"
+            return
+        yield f"{indent}<{sane_tag}>\n"
+        if isinstance(data, dict):
+            for k, v in data.items():
+                yield from _iter_xml_element(v, k, depth + 1)
+        else:
+            for item_in_list in data:
+                yield from _iter_xml_element(item_in_list, _list_item_tag(sane_tag, item_in_list), depth + 1)
+        yield f"{indent}</{sane_tag}>\n"
+    else:
+        text = str(data) if data is not None else ""
+        if text:
+            yield f"{indent}<{sane_tag}>{xml_escape_text(text)}</{sane_tag}>\n"
+        else:
+            yield f"{indent}<{sane_tag}/>\n"
+
+def iter_schedule_xml_chunks(schedule_data_wrapper_dict):
+    """
+    Yields the XML document for the main schedule data structure in small
+    chunks, so it can be written out without building a tree in memory.
+    The input `schedule_data_wrapper_dict` is expected to be like:
+    {"data": [schedule_object_or_error_dict]}
+    """
+    yield XML_DECLARATION
+    if not isinstance(schedule_data_wrapper_dict, dict) or "data" not in schedule_data_wrapper_dict:
+        yield from _iter_xml_element(
+            {"message": "Invalid input: Expected dict with 'data' key for XML generation."}, "error_root", 0
+        )
+        return
+    root_key_name = list(schedule_data_wrapper_dict.keys())[0]
+    # The root element wraps a same-named child holding the converted value, e.g. <data><data>...</data></data>
+    yield f"<{root_key_name}>\n"
+    yield from _iter_xml_element(schedule_data_wrapper_dict[root_key_name], root_key_name, 1)
+    yield f"</{root_key_name}>\n"
+
+def write_schedule_xml(schedule_data_wrapper_dict, file_obj):
+    """Streams the XML document for `schedule_data_wrapper_dict` into an open text file."""
+    for chunk in iter_schedule_xml_chunks(schedule_data_wrapper_dict):
+        file_obj.write(chunk)
+
+def generate_schedule_xml_string(schedule_data_wrapper_dict):
+    """
+    Generates an XML string from the main schedule data structure.
+    The input `schedule_data_wrapper_dict` is expected to be like:
+    {"data": [schedule_object_or_error_dict]}
+    """
+    return ''.join(iter_schedule_xml_chunks(schedule_data_wrapper_dict))
+
+def _minimal_error_xml(message, original_error_summary):
+    return XML_DECLARATION + ''.join(_iter_xml_element(
+        {"message": message, "original_error_summary": original_error_summary},
+        "fatal_xml_generation_error", 0
+    ))
+
+class JsonEmitter:
+    """Writes {"data": [object]} as JSON (the format TRMNL polls), indented by JSON_INDENT (0 = compact)."""
+    name = 'json'
+    aggregate = False
+
+    def __init__(self, output_filename=OUTPUT_JSON_FILENAME, indent=JSON_INDENT):
+        self.output_filename = output_filename
+        self.error_filename = f"ERROR_{output_filename}"
+        self.indent = indent or None
+
+    def emit(self, output_structure, filename):
+        try:
+            with open(filename, 'wb') as f:
+                f.write(dumps_json(output_structure, indent=self.indent))
+            print(f"Data (as {{'data': [object]}}) saved to {filename}")
+        except IOError as e:
+            print(f"\nError saving data to file {filename}: {e}")
+
+class NdjsonEmitter:
+    """Streams one JSON line per program (with its channel and date) for log-style archives and grep."""
+    name = 'ndjson'
+    aggregate = False
+
+    def __init__(self, output_filename=OUTPUT_NDJSON_FILENAME):
+        self.output_filename = output_filename
+        self.error_filename = f"ERROR_{output_filename}"
+
+    def emit(self, output_structure, filename):
+        try:
+            with open(filename, 'wb') as f:
+                for line in iter_ndjson_lines(output_structure):
+                    f.write(line)
+            print(f"NDJSON data saved to {filename}")
+        except IOError as e:
+            print(f"\nError saving NDJSON data to file {filename}: {e}")
+
+class MsgpackEmitter:
+    """Writes {"data": [object]} as MessagePack, the compact binary form for archives."""
+    name = 'msgpack'
+    aggregate = False
+
+    def __init__(self, output_filename=OUTPUT_MSGPACK_FILENAME):
+        self.output_filename = output_filename
+        self.error_filename = f"ERROR_{output_filename}"
+
+    def emit(self, output_structure, filename):
+        try:
+            with open(filename, 'wb') as f:
+                f.write(dumps_msgpack(output_structure))
+            print(f"MessagePack data saved to {filename}")
+        except IOError as e:
+            print(f"\nError saving MessagePack data to file {filename}: {e}")
+
+class XmlEmitter:
+    """Streams {"data": [object]} as pretty-printed XML (data/schedule_entry/program tree)."""
+    name = 'xml'
+    aggregate = False
+
+    def __init__(self, output_filename=OUTPUT_XML_FILENAME):
+        self.output_filename = output_filename
+        self.error_filename = f"ERROR_{output_filename}"
+
+    def emit(self, output_structure, filename):
+        print("Generating XML data...")
+        tmp_filename = f"{filename}.tmp"
+        try:
+            # Streamed into a temp file so a failure part-way never leaves a truncated XML behind
+            with open(tmp_filename, 'w', encoding='utf-8') as f:
+                write_schedule_xml(output_structure, f)
+            os.replace(tmp_filename, filename)
+            print(f"XML Data saved to {filename}")
+        except Exception as e:
+            print(f"\nError generating or saving XML data to file {filename}: {e}")
+            if os.path.exists(tmp_filename):
+                os.remove(tmp_filename)
+            error_filename = filename if filename.startswith("ERROR_") else f"ERROR_{filename}"
+            try:
+                schedule_object = (output_structure.get("data") or [{}])[0]
+                minimal_error_xml = _minimal_error_xml(
+                    f"Failed to generate full XML. Error: {str(e)}",
+                    schedule_object.get("error_summary", "N/A")
+                )
+                with open(error_filename, 'w', encoding='utf-8') as f_err_xml:
+                    f_err_xml.write(minimal_error_xml)
+                print(f"Minimal error XML saved to {error_filename}")
+            except Exception as e_xml_minimal:
+                print(f"Could not even save minimal error XML: {e_xml_minimal}")
+
+# Registry of available emitters, keyed by the names accepted in OUTPUT_FORMATS
+EMITTERS = {
+    JsonEmitter.name: JsonEmitter,
+    XmlEmitter.name: XmlEmitter,
+    NdjsonEmitter.name: NdjsonEmitter,
+    MsgpackEmitter.name: MsgpackEmitter,
+    XmltvEmitter.name: XmltvEmitter,
+    StoreEmitter.name: StoreEmitter,
+    ChangelogEmitter.name: ChangelogEmitter,
+    NowNextEmitter.name: NowNextEmitter,
+    WindowEmitter.name: WindowEmitter,
+}
+
+def build_emitters(format_names):
+    """Instantiates the emitters for the given format names, in order."""
+    emitters = []
+    for format_name in format_names:
+        if format_name not in EMITTERS:
+            raise ValueError(f"Unknown output format '{format_name}'. Expected one of: {', '.join(EMITTERS)}")
+        emitters.append(EMITTERS[format_name]())
+    return emitters
@@ -0,0 +1,343 @@
+"""Fetching raw schedule HTML from tv.kt.com, one request or many concurrently."""
+import copy
+import random
+import socket
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .config import (
+    FETCH_BACKOFF_BASE,
+    FETCH_BACKOFF_MAX,
+    FETCH_CONNECT_TIMEOUT,
+    FETCH_DEADLINE,
+    FETCH_HEDGE_AFTER,
+    FETCH_MAX_RETRIES,
+    FETCH_MAX_WORKERS,
+    FETCH_READ_TIMEOUT,
+    KT_SCHEDULE_URL,
+    MAX_REQUESTS_PER_HOST,
+)
+from .metrics import RUN_METRICS, profiled
+# Kept importable from here; it lives in timeline so the cache-only path need not load requests
+from .timeline import build_fetch_dates
+
+__all__ = [
+    'DEFAULT_FETCH_POLICY',
+    'FetchPolicy',
+    'RETRYABLE_STATUS_CODES',
+    'build_fetch_dates',
+    'create_http_session',
+    'fetch_schedule_html_post',
+    'fetch_schedules_concurrently',
+    'iter_schedules_concurrently',
+]
+
+# Statuses worth retrying: throttling and transient server-side failures
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+_RETRYABLE_EXCEPTIONS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+)
+
+class FetchPolicy:
+    """
+    Timeouts, retries and hedging for one schedule fetch. `connect_timeout` and
+    `read_timeout` are per attempt (the read timeout applies per socket read);
+    `deadline` bounds the whole fetch including retries and backoff sleeps.
+    A `hedge_after` > 0 sends a second identical request when the first has not
+    answered within that many seconds and keeps whichever finishes first.
+    A `rate_limiter` (anything with a blocking acquire(), e.g. the crawl's
+    TokenBucket) is taken before every HTTP attempt: retries and hedges included.
+    """
+
+    def __init__(self, connect_timeout=FETCH_CONNECT_TIMEOUT, read_timeout=FETCH_READ_TIMEOUT,
+                 max_retries=FETCH_MAX_RETRIES, backoff_base=FETCH_BACKOFF_BASE, backoff_max=FETCH_BACKOFF_MAX,
+                 hedge_after=FETCH_HEDGE_AFTER, deadline=FETCH_DEADLINE, rate_limiter=None):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_after = hedge_after
+        self.deadline = deadline
+        self.rate_limiter = rate_limiter
+
+    def with_rate_limiter(self, rate_limiter):
+        """A copy of this policy that takes a `rate_limiter` token before each attempt."""
+        limited = copy.copy(self)
+        limited.rate_limiter = rate_limiter
+        return limited
+
+    def wait_for_rate_limit(self):
+        if self.rate_limiter is not None:
+            with RUN_METRICS.time_stage('rate_limit_wait'):
+                self.rate_limiter.acquire()
+
+    def timeout(self, remaining):
+        """(connect, read) timeouts for the next attempt, capped by the time left before the deadline."""
+        remaining = max(0.01, remaining)
+        return (min(self.connect_timeout, remaining), min(self.read_timeout, remaining))
+
+    def backoff_delay(self, retry_number, retry_after=None):
+        """Full-jitter exponential backoff; a server Retry-After (capped at backoff_max) is a floor."""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** retry_number)))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.backoff_max))
+        return delay
+
+DEFAULT_FETCH_POLICY = FetchPolicy()
+
+class _RetryableHTTPError(requests.exceptions.HTTPError):
+    """A response whose status is in RETRYABLE_STATUS_CODES."""
+
+def _retry_after_seconds(failure):
+    response = getattr(failure, 'response', None)
+    value = response.headers.get('Retry-After') if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        # HTTP-date form; fall back to plain backoff
+        return None
+
+def _failure_reason(failure):
+    response = getattr(failure, 'response', None)
+    if response is not None:
+        return f"http_{response.status_code}"
+    return type(failure).__name__
+
+def _post_once(http, url, payload, headers, timeout, policy):
+    policy.wait_for_rate_limit()
+    RUN_METRICS.incr('fetch_requests_total')
+    request_started = time.perf_counter()
+    response = http.post(url, data=payload, headers=headers, timeout=timeout)
+    request_seconds = time.perf_counter() - request_started
+    # elapsed covers connect/TLS/server time up to the response headers; the rest is the body download
+    RUN_METRICS.observe('stage_seconds', response.elapsed.total_seconds(), stage='fetch_response_headers')
+    RUN_METRICS.observe('stage_seconds', max(0.0, request_seconds - response.elapsed.total_seconds()), stage='fetch_body')
+    RUN_METRICS.observe('fetch_response_bytes', len(response.content))
+    RUN_METRICS.incr('fetch_bytes_total', len(response.content))
+    if response.status_code in RETRYABLE_STATUS_CODES:
+        raise _RetryableHTTPError(f"{response.status_code} Server Error for url: {url}", response=response)
+    response.raise_for_status()
+    return response
+
+def _post_hedged(http, url, payload, headers, policy, remaining):
+    """One attempt, plus a hedged duplicate if the first is still pending after policy.hedge_after."""
+    timeout = policy.timeout(remaining)
+    if not policy.hedge_after or policy.hedge_after >= remaining:
+        return _post_once(http, url, payload, headers, timeout, policy)
+    executor = ThreadPoolExecutor(max_workers=2)
+    try:
+        primary = executor.submit(_post_once, http, url, payload, headers, timeout, policy)
+        done, _ = wait([primary], timeout=policy.hedge_after)
+        if done:
+            return primary.result()
+        RUN_METRICS.incr('fetch_hedges_total')
+        hedge = executor.submit(_post_once, http, url, payload, headers, policy.timeout(remaining - policy.hedge_after), policy)
+        pending = {primary, hedge}
+        last_failure = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    response = future.result()
+                except requests.exceptions.RequestException as e:
+                    last_failure = e
+                    continue
+                if future is hedge:
+                    RUN_METRICS.incr('fetch_hedge_wins_total')
+                return response
+        raise last_failure
+    finally:
+        # The losing request is left to finish (bounded by its timeouts) rather than waited for
+        executor.shutdown(wait=False)
+
+def _log_fetch_failure(url, e):
+    print(f"Error fetching URL {url}: {e}")
+    if hasattr(e, 'response') and e.response is not None:
+        print(f"Response status: {e.response.status_code}")
+        error_text = e.response.content
+        try:
+            decoded_error_text = error_text.decode('euc-kr')
+        except UnicodeDecodeError:
+            try:
+                decoded_error_text = error_text.decode(e.response.apparent_encoding or 'utf-8', errors='replace')
+            except Exception:
+                decoded_error_text = str(error_text)
+        print(f"Response text: {decoded_error_text[:500]}...")
+
+@profiled('fetch')
+def fetch_schedule_html_post(channel_id, date_str_yyyymmdd=None, channel_type="4", view_type_val="1", session=None,
+                             extra_headers=None, response_meta=None, url=KT_SCHEDULE_URL, policy=DEFAULT_FETCH_POLICY):
+    """
+    POSTs to pSchedule.asp (or `url`, e.g. a local stand-in) and returns the
+    decoded HTML, or None on failure. Timeouts, connection errors and
+    429/5xx responses are retried per `policy` until its deadline.
+    `extra_headers` (e.g. If-None-Match) are added to the request. If
+    `response_meta` is a dict it receives the status code and the ETag /
+    Last-Modified validators; on a 304 the returned text is empty.
+    """
+    payload = {
+        'ch_type': channel_type,
+        'service_ch_no': channel_id,
+        'view_type': view_type_val
+    }
+    if date_str_yyyymmdd:
+        payload['seldate'] = date_str_yyyymmdd
+        print(f"Fetching schedule for Channel ID: {channel_id}, Specific Date: {date_str_yyyymmdd}")
+    else:
+        print(f"Fetching schedule for Channel ID: {channel_id}, Current Day (server default)")
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+        'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8',
+        'Referer': 'https://tv.kt.com/',
+        'X-Requested-With': 'XMLHttpRequest',
+        'Origin': 'https://tv.kt.com'
+    }
+    if extra_headers:
+        headers.update(extra_headers)
+    http = session if session is not None else requests
+    print(f"Attempting to fetch schedule with payload: {payload}")
+    started = time.monotonic()
+    retry_number = 0
+    while True:
+        try:
+            response = _post_hedged(http, url, payload, headers, policy, policy.deadline - (time.monotonic() - started))
+            break
+        except requests.exceptions.RequestException as e:
+            reason = _failure_reason(e)
+            RUN_METRICS.incr('fetch_failures_total', reason=reason)
+            retryable = isinstance(e, (_RetryableHTTPError,) + _RETRYABLE_EXCEPTIONS)
+            delay = policy.backoff_delay(retry_number, _retry_after_seconds(e))
+            out_of_time = time.monotonic() - started + delay >= policy.deadline
+            if not retryable or retry_number >= policy.max_retries or out_of_time:
+                _log_fetch_failure(url, e)
+                return None
+            retry_number += 1
+            RUN_METRICS.incr('fetch_retries_total')
+            print(f"Fetch for Channel ID: {channel_id} failed ({reason}); retry {retry_number}/{policy.max_retries} in {delay:.2f}s")
+            time.sleep(delay)
+    if response_meta is not None:
+        response_meta['status'] = response.status_code
+        response_meta['etag'] = response.headers.get('ETag')
+        response_meta['last_modified'] = response.headers.get('Last-Modified')
+    if response.status_code == 304:
+        RUN_METRICS.incr('fetch_not_modified_total')
+        print(f"Schedule for Channel ID: {channel_id} not modified since last fetch (304).")
+        return ""
+    with RUN_METRICS.time_stage('decode'):
+        try:
+            response.encoding = 'euc-kr'
+            html_text = response.text
+        except UnicodeDecodeError:
+            response.encoding = response.apparent_encoding or 'utf-8'
+            html_text = response.text
+    return html_text
+
+def create_http_session(pool_size=MAX_REQUESTS_PER_HOST):
+    """
+    Creates a requests.Session whose keep-alive connection pool is shared by
+    every fetch in a run, so only the first request per connection pays for
+    the TCP/TLS handshake.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_size))
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+def _pool_connection_count(session):
+    """New connections (TCP + TLS handshakes) opened so far by the session's connection pools."""
+    total = 0
+    # http:// and https:// are mounted on the same adapter, so count each adapter once
+    for adapter in {id(a): a for a in session.adapters.values()}.values():
+        pools = getattr(getattr(adapter, 'poolmanager', None), 'pools', None)
+        if pools is None:
+            continue
+        for pool_key in pools.keys():
+            total += getattr(pools[pool_key], 'num_connections', 0)
+    return total
+
+def _time_dns_lookup(url):
+    """Resolves the fetch host once up front so DNS time shows up as its own stage."""
+    parsed = urlparse(url)
+    with RUN_METRICS.time_stage('dns'):
+        try:
+            socket.getaddrinfo(parsed.hostname, parsed.port or (443 if parsed.scheme == 'https' else 80), proto=socket.IPPROTO_TCP)
+        except (OSError, UnicodeError) as e:
+            RUN_METRICS.incr('fetch_failures_total', reason='dns')
+            print(f"DNS lookup for {parsed.hostname} failed: {e}")
+
+def iter_schedules_concurrently(channel_ids, dates, channel_type="4", view_type_val="1",
+                                max_workers=FETCH_MAX_WORKERS, max_per_host=MAX_REQUESTS_PER_HOST, session=None,
+                                extra_headers_by_job=None, response_meta_by_job=None, url=KT_SCHEDULE_URL,
+                                policy=DEFAULT_FETCH_POLICY, jobs=None):
+    """
+    Fetches every channel x date combination on a thread pool sharing one
+    keep-alive session. At most `max_per_host` requests are in flight per host.
+    Yields ((channel_id, date_str_yyyymmdd), HTML text or None) as each fetch
+    completes, so the caller can parse and write a page while others download.
+    Per-job request headers and response metadata dicts are keyed the same way.
+    `jobs` restricts the fetch to those (channel_id, date) pairs.
+    """
+    if jobs is None:
+        jobs = [(channel_id, date_str) for channel_id in channel_ids for date_str in dates]
+    if not jobs:
+        return
+    owns_session = session is None
+    if owns_session:
+        session = create_http_session(pool_size=max_per_host)
+    connections_before = _pool_connection_count(session)
+    _time_dns_lookup(url)
+    host_limits = {}
+    host_limits_lock = threading.Lock()
+
+    def _fetch_one(channel_id, date_str):
+        host = urlparse(url).netloc
+        with host_limits_lock:
+            limit = host_limits.setdefault(host, threading.BoundedSemaphore(max(1, max_per_host)))
+        job_meta = None
+        if response_meta_by_job is not None:
+            job_meta = response_meta_by_job.setdefault((channel_id, date_str), {})
+        with limit:
+            return fetch_schedule_html_post(
+                channel_id=channel_id,
+                date_str_yyyymmdd=date_str,
+                channel_type=channel_type,
+                view_type_val=view_type_val,
+                session=session,
+                extra_headers=(extra_headers_by_job or {}).get((channel_id, date_str)),
+                response_meta=job_meta,
+                url=url,
+                policy=policy
+            )
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(jobs))))
+    try:
+        futures = {executor.submit(_fetch_one, channel_id, date_str): (channel_id, date_str) for channel_id, date_str in jobs}
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                html_text = future.result()
+            except Exception as e:
+                print(f"Unexpected error fetching channel {key[0]} / date {key[1]}: {e}")
+                html_text = None
+            yield key, html_text
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        RUN_METRICS.incr('http_connections_opened_total', _pool_connection_count(session) - connections_before)
+        if owns_session:
+            session.close()
+
+def fetch_schedules_concurrently(channel_ids, dates, channel_type="4", view_type_val="1", **kwargs):
+    """
+    iter_schedules_concurrently collected into a dict mapping
+    (channel_id, date_str_yyyymmdd) to the HTML text (or None).
+    """
+    return dict(iter_schedules_concurrently(channel_ids, dates, channel_type, view_type_val, **kwargs))
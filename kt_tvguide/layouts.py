@@ -0,0 +1,138 @@
+"""
+The slices of a schedule each plugin layout actually renders, computed the
+same way the Liquid templates pick them, so a payload can carry just those.
+"""
+import time
+from datetime import datetime, timezone
+
+from .config import KST_TIMEZONE
+from .timeline import find_on_air_index, program_end_epochs, program_start_epochs
+
+# plugin/markup.html shows this many programs with the target at this position
+WINDOW_SIZE = 5
+WINDOW_TARGET_POSITION = 2
+
+# What the templates read; the rest (icons, per-program epochs, request context) is dropped from compact payloads
+TEMPLATE_SCHEDULE_KEYS = (
+    'channel_name', 'date_displayed', 'program_start_epochs_utc', 'schedule_end_epoch_utc', 'script_run_epoch_utc',
+)
+TEMPLATE_PROGRAM_KEYS = ('time', 'title', 'genre', 'is_on_air')
+
+def _start_epochs(schedule_data):
+    return schedule_data.get('program_start_epochs_utc') or program_start_epochs(schedule_data) or []
+
+def _is_today(schedule_data, now_epoch):
+    today_kst = datetime.fromtimestamp(now_epoch, timezone.utc).astimezone(KST_TIMEZONE).strftime('%Y-%m-%d')
+    return schedule_data.get('date_displayed') == today_kst
+
+def _server_on_air_index(programs):
+    for index, program in enumerate(programs):
+        if program.get('is_on_air') is True:
+            return index
+    return -1
+
+def _last_started_index(start_epochs, now_epoch):
+    last_started = -1
+    for index, start_epoch in enumerate(start_epochs):
+        if start_epoch > now_epoch:
+            break
+        last_started = index
+    return last_started
+
+def slice_schedule(schedule_data, start, end, now_epoch=None):
+    """
+    A copy of the schedule holding programs[start:end], with is_on_air from the
+    clock and the epoch index / schedule end narrowed to match, so the
+    templates' own on-air scan works unchanged on the slice. An empty slice
+    has an empty index and no schedule end.
+    """
+    now_epoch = int(time.time()) if now_epoch is None else now_epoch
+    programs = schedule_data.get('programs') or []
+    start_epochs = _start_epochs(schedule_data)
+    on_air_index = find_on_air_index(start_epochs, now_epoch) if start_epochs else _server_on_air_index(programs)
+    sliced = {key: value for key, value in schedule_data.items() if key not in ('programs', 'program_start_epochs_utc')}
+    sliced['programs'] = [
+        dict(program, is_on_air=index == on_air_index)
+        for index, program in enumerate(programs[start:end], start)
+    ]
+    if start_epochs:
+        sliced['program_start_epochs_utc'] = start_epochs[start:end]
+        slice_ends = program_end_epochs(start_epochs)[start:end]
+        sliced['schedule_end_epoch_utc'] = slice_ends[-1] if slice_ends else None
+    return sliced
+
+def _now_next_bounds(schedule_data, now_epoch):
+    programs = schedule_data.get('programs') or []
+    start_epochs = _start_epochs(schedule_data)
+    current_index = find_on_air_index(start_epochs, now_epoch) if start_epochs else -1
+    if current_index == -1:
+        current_index = _server_on_air_index(programs)
+    if current_index != -1:
+        return current_index, min(current_index + 2, len(programs))
+    if start_epochs and _is_today(schedule_data, now_epoch):
+        next_index = _last_started_index(start_epochs, now_epoch) + 1
+        return next_index, min(next_index + 1, len(programs))
+    return 0, 0
+
+def _window_bounds(schedule_data, now_epoch, size=WINDOW_SIZE, target_position=WINDOW_TARGET_POSITION):
+    programs = schedule_data.get('programs') or []
+    start_epochs = _start_epochs(schedule_data)
+    target_index = find_on_air_index(start_epochs, now_epoch) if start_epochs else -1
+    if target_index == -1:
+        target_index = _server_on_air_index(programs)
+    if target_index == -1 and start_epochs and _is_today(schedule_data, now_epoch):
+        next_index = _last_started_index(start_epochs, now_epoch) + 1
+        if next_index < len(programs):
+            target_index = next_index
+    target_index = max(target_index, 0)
+    start = min(max(target_index - target_position, 0), max(len(programs) - size, 0))
+    return start, min(start + size, len(programs))
+
+def _layout_slice(bounds, schedule_data, now_epoch, horizon_seconds):
+    """
+    The slice `bounds` picks now, widened to also hold what it will pick at
+    now + horizon_seconds, so the template still finds its programs until then.
+    """
+    now_epoch = int(time.time()) if now_epoch is None else now_epoch
+    ranges = [bounds(schedule_data, now_epoch)]
+    if horizon_seconds:
+        ranges.append(bounds(schedule_data, now_epoch + horizon_seconds))
+    ranges = [(start, end) for start, end in ranges if end > start]
+    if not ranges:
+        return slice_schedule(schedule_data, 0, 0, now_epoch)
+    return slice_schedule(schedule_data, min(r[0] for r in ranges), max(r[1] for r in ranges), now_epoch)
+
+def full_schedule(schedule_data, now_epoch=None, horizon_seconds=0):
+    return slice_schedule(schedule_data, 0, None, now_epoch)
+
+def now_next_slice(schedule_data, now_epoch=None, horizon_seconds=0):
+    """
+    What plugin/now-next-layout.html shows: the program on air and the one
+    after it; for today with nothing on air, just the next program.
+    """
+    return _layout_slice(_now_next_bounds, schedule_data, now_epoch, horizon_seconds)
+
+def centered_window(schedule_data, now_epoch=None, horizon_seconds=0):
+    """
+    What plugin/markup.html shows: WINDOW_SIZE programs with the on-air program
+    (or today's next one, or the first) at WINDOW_TARGET_POSITION, clamped to the list.
+    """
+    return _layout_slice(_window_bounds, schedule_data, now_epoch, horizon_seconds)
+
+def compact_schedule(schedule_data):
+    """Only the fields the plugin templates read; error objects pass through whole."""
+    if 'error_summary' in schedule_data:
+        return schedule_data
+    compact = {key: schedule_data[key] for key in TEMPLATE_SCHEDULE_KEYS if key in schedule_data}
+    compact['programs'] = [
+        {key: program[key] for key in TEMPLATE_PROGRAM_KEYS if key in program}
+        for program in schedule_data.get('programs') or []
+    ]
+    return compact
+
+# Layout name -> function(schedule_data, now_epoch, horizon_seconds) returning the object placed in {"data": [...]}
+LAYOUTS = {
+    'schedule': full_schedule,
+    'now-next': now_next_slice,
+    'window': centered_window,
+}
@@ -0,0 +1,294 @@
+"""
+Per-run instrumentation: stage timers, counters and histograms, written out
+as a JSON-lines record or a Prometheus textfile at the end of each run, plus
+opt-in cProfile / tracemalloc hooks around fetching and parsing.
+"""
+import bisect
+import functools
+import io
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from .config import METRICS_FORMAT, METRICS_FORMATS, METRICS_REPORT_PATH, PROFILE_HOOKS, PROFILE_OUTPUT_DIR
+
+# The profilers cost more to import than the rest of the package; only load them when hooked in
+if PROFILE_HOOKS:
+    import cProfile
+    import pstats
+    import tracemalloc
+
+METRIC_PREFIX = 'kt_tvguide_'
+
+# Upper bucket bounds per histogram; anything not listed uses the stage-duration buckets
+HISTOGRAM_BUCKETS = {
+    'stage_seconds': (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 15.0),
+    'fetch_response_bytes': (1024, 4096, 16384, 65536, 262144, 1048576),
+    'rows_parsed': (0, 10, 20, 30, 50, 100, 500),
+    'programs_per_slot': (0, 1, 2, 3, 4, 6, 10),
+    'traced_memory_bytes': (1048576, 4194304, 16777216, 67108864, 268435456),
+}
+
+# Counters reported even when nothing incremented them, so dashboards see a 0 rather than a gap
+DECLARED_COUNTERS = (
+    'fetch_requests_total',
+    'fetch_failures_total',
+    'fetch_not_modified_total',
+    'fetch_retries_total',
+    'fetch_hedges_total',
+    'fetch_hedge_wins_total',
+    'fetch_bytes_total',
+    'http_connections_opened_total',
+    'rows_parsed_total',
+    'parse_errors_total',
+    'cache_hits_total',
+    'stale_served_total',
+    'crawl_jobs_resumed_total',
+    'crawl_shards_unchanged_total',
+)
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense (count/sum plus per-bound counts)."""
+
+    def __init__(self, bounds):
+        self.bounds = tuple(bounds)
+        self.bucket_counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        self.bucket_counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def cumulative(self):
+        """[(upper_bound, count <= bound)], ending with ('+Inf', count)."""
+        running = 0
+        pairs = []
+        for bound, bucket_count in zip(self.bounds + ('+Inf',), self.bucket_counts):
+            running += bucket_count
+            pairs.append((bound, running))
+        return pairs
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'min': self.min,
+            'max': self.max,
+            'buckets': {str(bound): count for bound, count in self.cumulative()},
+        }
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+def _format_labels(label_key):
+    if not label_key:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in label_key) + '}'
+
+def _series_name(name, label_key):
+    return name + _format_labels(label_key)
+
+class RunMetrics:
+    """Thread-safe counters and histograms for one run, keyed by name and labels."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started_at = time.time()
+            self.counters = {(name, ()): 0 for name in DECLARED_COUNTERS}
+            self.histograms = {}
+
+    def incr(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(HISTOGRAM_BUCKETS.get(name, HISTOGRAM_BUCKETS['stage_seconds']))
+            histogram.observe(value)
+
+    @contextmanager
+    def time_stage(self, stage, **labels):
+        """Times the block into the stage_seconds histogram, even when it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('stage_seconds', time.perf_counter() - start, stage=stage, **labels)
+
+    def stage_totals(self):
+        """{stage label string: (calls, total seconds)} for the run summary."""
+        totals = {}
+        with self._lock:
+            for (name, label_key), histogram in self.histograms.items():
+                if name == 'stage_seconds':
+                    labels = dict(label_key)
+                    stage = labels.pop('stage', '')
+                    extra = ','.join(str(value) for value in labels.values())
+                    totals[f"{stage}[{extra}]" if extra else stage] = (histogram.count, histogram.sum)
+        return totals
+
+    def to_record(self):
+        """One JSON-serializable record describing the whole run."""
+        with self._lock:
+            return {
+                'run_started_utc': datetime.fromtimestamp(self.started_at, timezone.utc).isoformat(),
+                'duration_seconds': time.time() - self.started_at,
+                'counters': {_series_name(name, key): value for (name, key), value in sorted(self.counters.items())},
+                'histograms': {_series_name(name, key): h.to_dict() for (name, key), h in sorted(self.histograms.items())},
+            }
+
+    def to_prometheus(self):
+        """The run in Prometheus text exposition format (for the node_exporter textfile collector)."""
+        lines = []
+        with self._lock:
+            counter_names = sorted({name for name, _ in self.counters})
+            for name in counter_names:
+                lines.append(f"# TYPE {METRIC_PREFIX}{name} counter")
+                for (series, label_key), value in sorted(self.counters.items()):
+                    if series == name:
+                        lines.append(f"{METRIC_PREFIX}{name}{_format_labels(label_key)} {value}")
+            for name in sorted({name for name, _ in self.histograms}):
+                lines.append(f"# TYPE {METRIC_PREFIX}{name} histogram")
+                for (series, label_key), histogram in sorted(self.histograms.items()):
+                    if series != name:
+                        continue
+                    for bound, count in histogram.cumulative():
+                        bucket_key = label_key + (('le', bound),)
+                        lines.append(f"{METRIC_PREFIX}{name}_bucket{_format_labels(bucket_key)} {count}")
+                    lines.append(f"{METRIC_PREFIX}{name}_sum{_format_labels(label_key)} {histogram.sum}")
+                    lines.append(f"{METRIC_PREFIX}{name}_count{_format_labels(label_key)} {histogram.count}")
+            lines.append(f"# TYPE {METRIC_PREFIX}last_run_timestamp_seconds gauge")
+            lines.append(f"{METRIC_PREFIX}last_run_timestamp_seconds {int(self.started_at)}")
+        return '\n'.join(lines) + '\n'
+
+# The registry every stage records into; reset at the start of each pipeline run
+RUN_METRICS = RunMetrics()
+
+def write_run_report(path=METRICS_REPORT_PATH, report_format=METRICS_FORMAT, metrics=RUN_METRICS):
+    """
+    Writes the run report: 'jsonl' appends one line per run, 'prometheus'
+    atomically replaces a textfile. Does nothing when `path` is empty.
+    """
+    if not path:
+        return
+    if report_format not in METRICS_FORMATS:
+        raise ValueError(f"Unknown metrics format '{report_format}'. Expected one of: {', '.join(METRICS_FORMATS)}")
+    try:
+        if report_format == 'jsonl':
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(metrics.to_record(), ensure_ascii=False) + '\n')
+        else:
+            temp_path = path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(metrics.to_prometheus())
+            os.replace(temp_path, path)
+        print(f"Run metrics written to {path} ({report_format})")
+    except IOError as e:
+        print(f"Error writing run metrics to {path}: {e}")
+
+def print_stage_summary(metrics=RUN_METRICS):
+    totals = metrics.stage_totals()
+    if not totals:
+        return
+    print("\n--- Stage timings ---")
+    for stage, (calls, seconds) in sorted(totals.items(), key=lambda item: -item[1][1]):
+        print(f"  {stage:<32} {calls:>4} call(s) {seconds * 1000:>10.1f} ms")
+
+class _Profiler:
+    """
+    Collects cProfile stats and tracemalloc peaks for functions wrapped with
+    @profiled. Only one call is measured at a time: Python 3.12+ allows a single
+    active profiler per process, and the tracemalloc peak is process-wide. Calls
+    that overlap a measured one (concurrent fetches) run unmeasured and are
+    counted in profiled_calls_skipped_total.
+    """
+
+    def __init__(self, hooks):
+        self.hooks = hooks
+        self._lock = threading.Lock()
+        self._measuring = threading.Lock()
+        self._stats = {}
+
+    def call(self, stage, func, args, kwargs):
+        if not self._measuring.acquire(blocking=False):
+            RUN_METRICS.incr('profiled_calls_skipped_total', stage=stage)
+            return func(*args, **kwargs)
+        try:
+            return self._measured_call(stage, func, args, kwargs)
+        finally:
+            self._measuring.release()
+
+    def _measured_call(self, stage, func, args, kwargs):
+        if 'tracemalloc' in self.hooks:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            # The peak is since tracing started (or the last reset); restart it so it covers this call only
+            tracemalloc.reset_peak()
+        profile = cProfile.Profile() if 'cprofile' in self.hooks else None
+        if profile is not None:
+            try:
+                profile.enable()
+            except ValueError:
+                # Another profiler (e.g. an outer `python -m cProfile`) already holds the slot
+                RUN_METRICS.incr('profiled_calls_skipped_total', stage=stage)
+                profile = None
+        try:
+            return func(*args, **kwargs)
+        finally:
+            if profile is not None:
+                profile.disable()
+                with self._lock:
+                    if stage in self._stats:
+                        self._stats[stage].add(profile)
+                    else:
+                        self._stats[stage] = pstats.Stats(profile, stream=io.StringIO())
+            if 'tracemalloc' in self.hooks and tracemalloc.is_tracing():
+                RUN_METRICS.observe('traced_memory_bytes', tracemalloc.get_traced_memory()[1], stage=stage)
+
+    def dump(self, output_dir):
+        """Writes <stage>.pstats per wrapped stage and the top allocation sites, then starts over."""
+        os.makedirs(output_dir, exist_ok=True)
+        with self._lock:
+            for stage, stats in self._stats.items():
+                stats.dump_stats(os.path.join(output_dir, f"{stage}.pstats"))
+            self._stats = {}
+        if tracemalloc.is_tracing():
+            top = tracemalloc.take_snapshot().statistics('lineno')[:25]
+            with open(os.path.join(output_dir, 'tracemalloc_top.txt'), 'w', encoding='utf-8') as f:
+                f.write('\n'.join(str(stat) for stat in top) + '\n')
+            tracemalloc.stop()
+        print(f"Profiles written to {output_dir}/")
+
+_PROFILER = _Profiler(PROFILE_HOOKS) if PROFILE_HOOKS else None
+
+def profiled(stage):
+    """Runs the function under cProfile / tracemalloc when PROFILE_HOOKS enables them; a plain call otherwise."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _PROFILER is None:
+                return func(*args, **kwargs)
+            return _PROFILER.call(stage, func, args, kwargs)
+        return wrapper
+    return decorator
+
+def dump_profiles(output_dir=PROFILE_OUTPUT_DIR):
+    if _PROFILER is not None:
+        _PROFILER.dump(output_dir)
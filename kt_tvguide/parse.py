@@ -0,0 +1,165 @@
+"""Parsing pSchedule.asp HTML into the schedule dictionary shared by every emitter."""
+import re
+
+from bs4 import BeautifulSoup
+
+from .config import PARSER_BACKEND, PARSER_BACKENDS
+from .metrics import RUN_METRICS, profiled
+from .records import ChannelDaySchedule, ProgramRecord
+
+# <strong class="day"> text, e.g. "2025년 6월 1일 (일)"
+_KOREAN_DATE_PATTERN = re.compile(r"(\d{4})년\s*(\d{1,2})월\s*(\d{1,2})일")
+
+def _extract_title_via_subsoup(program_p):
+    """
+    Legacy title extraction: re-parses the <p> on its own, decomposes the
+    on-air badge and icon tags, and reads the remaining text.
+    """
+    temp_program_soup = BeautifulSoup(str(program_p), 'html.parser')
+    current_p_for_text = temp_program_soup.p
+    is_on_air = False
+    program_title = "N/A"
+    if current_p_for_text:
+        online_strong_tag = current_p_for_text.find('strong', class_='online')
+        if online_strong_tag:
+            is_on_air = True
+            online_strong_tag.decompose()
+        for b_tag in current_p_for_text.find_all('b'):
+            b_tag.decompose()
+        program_title = current_p_for_text.get_text(separator=' ', strip=True)
+    return program_title, is_on_air
+
+def _extract_title_single_pass(program_p):
+    """
+    Reads the title and on-air flag straight from the original tree. Text under
+    the first <strong class="online"> badge or any <b> icon wrapper is skipped,
+    which is exactly what the legacy path decomposes, so the output is identical.
+    """
+    online_strong_tag = program_p.find('strong', class_='online')
+    title_parts = []
+    for text in program_p.strings:
+        node = text.parent
+        while node is not program_p and node is not online_strong_tag and node.name != 'b':
+            node = node.parent
+        if node is not program_p:
+            continue
+        text = text.strip()
+        if text:
+            title_parts.append(text)
+    return ' '.join(title_parts), online_strong_tag is not None
+
+def _make_program_dict(time_str, title, is_on_air, icons, genre):
+    return {
+        'time': time_str,
+        'title': title,
+        'is_on_air': is_on_air,
+        'icons': icons,
+        'genre': genre,
+    }
+
+@profiled('parse')
+def _parse_schedule(html_content, channel_id_for_log, requested_date_str, parser_backend, make_program):
+    """
+    Shared parsing path. `make_program(time, title, is_on_air, icons, genre)`
+    builds each entry of schedule_data['programs'] (a dict or a compact record).
+    """
+    if not html_content:
+        return {
+            "error_summary": "No HTML content received to parse.",
+            "channel_id_requested": channel_id_for_log,
+            "date_requested": requested_date_str if requested_date_str else "Current Day (default)"
+        }
+    if parser_backend not in PARSER_BACKENDS:
+        raise ValueError(f"Unknown parser backend '{parser_backend}'. Expected one of: {', '.join(PARSER_BACKENDS)}")
+    with RUN_METRICS.time_stage('parse_html_tree'):
+        soup = BeautifulSoup(html_content, 'html.parser')
+    schedule_data = {}
+    schedule_data['channel_id_requested'] = channel_id_for_log
+    schedule_data['date_requested'] = requested_date_str if requested_date_str else "Current Day (default)"
+    date_tag = soup.find('strong', class_='day')
+    if date_tag:
+        date_str_raw = date_tag.get_text(strip=True)
+        match = _KOREAN_DATE_PATTERN.match(date_str_raw)
+        if match:
+            year, month, day = match.groups()
+            schedule_data['date_displayed'] = f"{year}-{int(month):02d}-{int(day):02d}"
+        else:
+            schedule_data['date_displayed'] = date_str_raw
+    else:
+        if not soup.find('table', class_='board tb_schedule'):
+            schedule_data['error_summary'] = "Core schedule structure (date or table) not found in HTML."
+            schedule_data['date_displayed'] = "N/A (parsing error)"
+        else:
+             schedule_data['date_displayed'] = "N/A (date tag not found in HTML)"
+    channel_logo_tag = soup.find('h5', class_='b_logo')
+    if channel_logo_tag and channel_logo_tag.find('img'):
+        img_tag = channel_logo_tag.find('img')
+        schedule_data['channel_name'] = img_tag.get('alt', f'Channel ID: {channel_id_for_log}')
+        logo_src = img_tag.get('src', '')
+        if logo_src.startswith('http'):
+            schedule_data['channel_logo_url'] = logo_src
+        elif logo_src:
+            schedule_data['channel_logo_url'] = "https://tv.kt.com" + logo_src
+        else:
+            schedule_data['channel_logo_url'] = ''
+    else:
+        schedule_data['channel_name'] = f'Channel ID: {channel_id_for_log}'
+        schedule_data['channel_logo_url'] = ''
+    schedule_data['programs'] = []
+    schedule_table = soup.find('table', class_='board tb_schedule')
+    if schedule_table and schedule_table.find('tbody'):
+        rows = schedule_table.find('tbody').find_all('tr')
+        for row in rows:
+            cells = row.find_all('td')
+            if len(cells) < 4: continue
+            hour_str = cells[0].get_text(strip=True)
+            minute_p_tags = cells[1].find_all('p')
+            program_p_tags = cells[2].find_all('p')
+            category_p_tags = cells[3].find_all('p')
+            num_programs_in_slot = len(program_p_tags)
+            RUN_METRICS.observe('programs_per_slot', num_programs_in_slot)
+            for i in range(num_programs_in_slot):
+                program_p_current = program_p_tags[i]
+                minute_str = "00"
+                if i < len(minute_p_tags): minute_str = minute_p_tags[i].get_text(strip=True)
+                if parser_backend == 'soup':
+                    program_title, is_on_air = _extract_title_via_subsoup(program_p_current)
+                else:
+                    program_title, is_on_air = _extract_title_single_pass(program_p_current)
+                icons = []
+                for b_tag in program_p_current.find_all('b'):
+                    img_icon_tag = b_tag.find('img')
+                    alt_text = img_icon_tag.get('alt', '').strip() if img_icon_tag else ''
+                    if alt_text:
+                        icons.append(alt_text)
+                    elif img_icon_tag:
+                        icon_src = img_icon_tag.get('src','')
+                        icons.append(f"Icon (src: {icon_src})")
+                genre_str = "N/A"
+                if i < len(category_p_tags): genre_str = category_p_tags[i].get_text(strip=True)
+                schedule_data['programs'].append(
+                    make_program(f"{hour_str}:{minute_str}", program_title, is_on_air, icons, genre_str)
+                )
+    elif 'error_summary' not in schedule_data:
+         schedule_data.setdefault('error_summary', "Schedule table ('board tb_schedule') not found in the HTML.")
+    if not schedule_data.get('programs') and 'error_summary' not in schedule_data:
+        schedule_data.setdefault('error_summary', "No programs found.")
+    RUN_METRICS.observe('rows_parsed', len(schedule_data['programs']))
+    RUN_METRICS.incr('rows_parsed_total', len(schedule_data['programs']))
+    return schedule_data
+
+def parse_schedule_to_dict(html_content, channel_id_for_log="N/A", requested_date_str="N/A", parser_backend=PARSER_BACKEND):
+    return _parse_schedule(html_content, channel_id_for_log, requested_date_str, parser_backend, _make_program_dict)
+
+def parse_schedule_to_records(html_content, channel_id_for_log="N/A", requested_date_str="N/A", parser_backend=PARSER_BACKEND):
+    """
+    Same parse, but programs are built straight into compact ProgramRecords and
+    returned as a ChannelDaySchedule; call .to_dict() at the emit boundary.
+    """
+    schedule_data = _parse_schedule(
+        html_content, channel_id_for_log, requested_date_str, parser_backend, ProgramRecord.from_fields
+    )
+    return ChannelDaySchedule.from_parsed(schedule_data)
+
+# The JSON script historically exposed the same parser under this name
+parse_schedule_to_json = parse_schedule_to_dict
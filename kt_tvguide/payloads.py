@@ -0,0 +1,70 @@
+"""
+Per-layout payload emitters: instead of the whole day, each file holds only
+the programs one plugin layout renders (plus enough lookahead to stay correct
+until the next run), with only the fields its template reads, as compact JSON.
+"""
+import gzip
+import os
+
+from .config import (
+    LAYOUT_PAYLOAD_GZIP,
+    LAYOUT_PAYLOAD_HORIZON,
+    OUTPUT_NOW_NEXT_FILENAME,
+    OUTPUT_WINDOW_FILENAME,
+)
+from .layouts import LAYOUTS, compact_schedule
+from .serializers import dumps_json
+
+def layout_payload_bytes(schedule_object, layout, now_epoch=None, horizon_seconds=LAYOUT_PAYLOAD_HORIZON):
+    """The compact UTF-8 JSON {"data": [...]} for one layout of a schedule (or error) object."""
+    if 'error_summary' in schedule_object:
+        payload_object = schedule_object
+    else:
+        payload_object = compact_schedule(LAYOUTS[layout](schedule_object, now_epoch, horizon_seconds))
+    return dumps_json({"data": [payload_object]})
+
+class LayoutPayloadEmitter:
+    """Writes the minimal payload for `layout`, and a .gz copy next to it when LAYOUT_PAYLOAD_GZIP is set."""
+    name = None
+    layout = None
+    aggregate = False
+
+    def __init__(self, output_filename, horizon_seconds=LAYOUT_PAYLOAD_HORIZON, write_gzip=LAYOUT_PAYLOAD_GZIP):
+        self.output_filename = output_filename
+        self.error_filename = f"ERROR_{output_filename}"
+        self.horizon_seconds = horizon_seconds
+        self.write_gzip = write_gzip
+
+    def _write(self, filename, data):
+        tmp_filename = f"{filename}.tmp"
+        with open(tmp_filename, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_filename, filename)
+
+    def emit(self, output_structure, filename):
+        schedule_object = (output_structure.get("data") or [{}])[0]
+        try:
+            body = layout_payload_bytes(schedule_object, self.layout, horizon_seconds=self.horizon_seconds)
+            self._write(filename, body)
+            if self.write_gzip:
+                # mtime=0 keeps the archive byte-identical when the payload is, so unchanged runs commit nothing
+                self._write(f"{filename}.gz", gzip.compress(body, compresslevel=9, mtime=0))
+            print(f"{self.layout} payload ({len(body)} bytes) saved to {filename}")
+        except (IOError, OSError) as e:
+            print(f"\nError saving {self.layout} payload to file {filename}: {e}")
+
+class NowNextEmitter(LayoutPayloadEmitter):
+    """The on-air and next programs, for plugin/now-next-layout.html."""
+    name = 'now-next'
+    layout = 'now-next'
+
+    def __init__(self, output_filename=OUTPUT_NOW_NEXT_FILENAME, **kwargs):
+        super().__init__(output_filename, **kwargs)
+
+class WindowEmitter(LayoutPayloadEmitter):
+    """The centered 5-program window, for plugin/markup.html."""
+    name = 'window'
+    layout = 'window'
+
+    def __init__(self, output_filename=OUTPUT_WINDOW_FILENAME, **kwargs):
+        super().__init__(output_filename, **kwargs)
@@ -0,0 +1,389 @@
+"""
+One run: fetch every channel/day once, parse each page once, hand the result to every emitter.
+
+The HTTP client (.fetch, requests) and the HTML parser (.parse, bs4) are imported
+only when a page actually has to be fetched or parsed, so a run served from a
+fresh cache (CACHE_MAX_AGE) starts without either.
+"""
+import argparse
+import os
+import time
+from datetime import datetime, timezone
+
+from .cache import ScheduleCache, content_hash
+from .config import (
+    CACHE_MAX_AGE,
+    CHANNEL_IDS,
+    DAEMON_MODE,
+    DEFAULT_CHANNEL_TYPE,
+    DEFAULT_VIEW_TYPE,
+    FETCH_DAYS,
+    KST_TIMEZONE,
+    KT_SCHEDULE_URL,
+    OUTPUT_FORMATS,
+    PARSER_BACKEND,
+    SCHEDULE_CACHE_DIR,
+    SERVE_STALE_ON_FETCH_ERROR,
+)
+from .diff import schedule_unchanged
+from .emitters import build_emitters, output_filename_for
+from .metrics import RUN_METRICS, dump_profiles, print_stage_summary, write_run_report
+from .timeline import annotate_program_times, build_fetch_dates, recompute_is_on_air
+
+def stamp_run_time(schedule_object):
+    """Refreshes the cache-busting run timestamps TRMNL uses to detect new data."""
+    schedule_object['script_run_epoch_utc'] = int(time.time())
+    schedule_object['script_run_iso_utc'] = datetime.now(timezone.utc).isoformat()
+
+def build_output_object(html, channel_id, requested_date_context_str, parser_backend=PARSER_BACKEND):
+    """
+    Turns a fetched HTML page (or None on fetch failure) into the schedule or
+    error object placed in the {"data": [...]} wrapper. Returns (object, is_error).
+    is_on_air is set from the clock, as on the cached paths, rather than taken
+    from the server's badge, so a re-served page never flips it on its own.
+    """
+    if html:
+        from .parse import parse_schedule_to_dict
+        with RUN_METRICS.time_stage('parse'):
+            parsed_data = parse_schedule_to_dict(html, channel_id, requested_date_context_str, parser_backend=parser_backend)
+        stamp_run_time(parsed_data)
+        if "error_summary" not in parsed_data:
+            with RUN_METRICS.time_stage('annotate'):
+                annotate_program_times(parsed_data)
+                recompute_is_on_air(parsed_data)
+            parsed_data['schedule_context_message'] = f"Displaying schedule for {parsed_data.get('date_displayed', 'current day')}."
+            return parsed_data, False
+        RUN_METRICS.incr('parse_errors_total')
+        return parsed_data, True
+    error_data = {
+        "error_summary": "Failed to fetch HTML from server.",
+        "channel_id_requested": channel_id,
+        "date_requested": requested_date_context_str,
+        "script_run_epoch_utc": int(time.time()),
+        "script_run_iso_utc": datetime.now(timezone.utc).isoformat()
+    }
+    return error_data, True
+
+def requested_date_context(date_str_yyyymmdd, today_kst_str):
+    if date_str_yyyymmdd:
+        return f"Specific Date: {date_str_yyyymmdd}"
+    return f"Current Day (KST approx: {today_kst_str})"
+
+def _output_filenames(emitters, is_error, channel_id, date_str_yyyymmdd, single_output):
+    return [
+        output_filename_for(
+            emitter.error_filename if is_error else emitter.output_filename,
+            channel_id,
+            date_str_yyyymmdd,
+            single_output
+        )
+        for emitter in emitters
+    ]
+
+def _fresh_cache_entry(cache, cache_key, max_age):
+    """The cached entry when its page was fetched or confirmed within `max_age` seconds, else None."""
+    age = cache.age_seconds(cache_key)
+    if age is None or age > max_age:
+        return None
+    entry = cache.load(cache_key)
+    return entry if entry and entry.get('schedule') else None
+
+def _reuse_cached_schedule(cache, cache_key, html, output_filenames):
+    """
+    Short-circuits parsing when the HTML content hash matches the cached one.
+    Returns (schedule_object, outputs_need_writing), or (None, True) when the
+    page has to be parsed. Only is_on_air and the run timestamps are patched.
+    """
+    entry = cache.load(cache_key)
+    if not entry or not entry.get('schedule') or entry.get('sha256') != content_hash(html):
+        return None, True
+    return _refresh_cached_schedule(cache, cache_key, entry, output_filenames)
+
+def _serve_stale_schedule(cache, cache_key, output_filenames):
+    """
+    Stale-while-revalidate fallback for a failed fetch: the last good cached
+    schedule for the same channel/date with is_on_air recomputed from the
+    clock. Returns (schedule_object, outputs_need_writing), or (None, True)
+    when nothing usable is cached.
+    """
+    entry = cache.load(cache_key)
+    if not entry or not entry.get('schedule'):
+        return None, True
+    return _refresh_cached_schedule(cache, cache_key, entry, output_filenames)
+
+def _patch_on_air(schedule_object, output_filenames):
+    """
+    Recomputes is_on_air from the clock. Returns True, after refreshing the run
+    timestamps, when the outputs need rewriting: the on-air program moved or
+    an output file is missing.
+    """
+    on_air_changed = recompute_is_on_air(schedule_object)
+    # Schedules cached before the epoch fields existed are annotated once
+    annotations_missing = 'program_start_epochs_utc' not in schedule_object
+    if annotations_missing:
+        annotate_program_times(schedule_object)
+    outputs_missing = not all(os.path.exists(filename) for filename in output_filenames)
+    if not on_air_changed and not outputs_missing and not annotations_missing:
+        return False
+    stamp_run_time(schedule_object)
+    return True
+
+def _refresh_cached_schedule(cache, cache_key, entry, output_filenames):
+    schedule_object = entry['schedule']
+    if not _patch_on_air(schedule_object, output_filenames):
+        return schedule_object, False
+    cache.store_schedule(cache_key, schedule_object, entry['sha256'], entry.get('etag'), entry.get('last_modified'))
+    return schedule_object, True
+
+class OrderedHandoff:
+    """
+    Passes each job's object to `release` in `jobs` order. Jobs that complete
+    early are held until every job before them is done, so aggregate emitters
+    see each channel's days in order while pages are handled as they arrive.
+    """
+
+    def __init__(self, jobs, release):
+        self.jobs = jobs
+        self.release = release
+        self._completed = {}
+        self._released = 0
+
+    def complete(self, job, value):
+        self._completed[job] = value
+        while self._released < len(self.jobs) and self.jobs[self._released] in self._completed:
+            self.release(self._completed.pop(self.jobs[self._released]))
+            self._released += 1
+
+def resolve_fetched_page(cache, cache_key, html, response_meta, channel_id, date_str, today_kst_str,
+                         ok_filenames, parser_backend, refetch=None):
+    """
+    Turns one fetched page (or None) into (schedule_object, is_error,
+    outputs_need_writing): a 304 or unchanged content hash reuses the cached
+    schedule, a failed fetch falls back to it (SERVE_STALE_ON_FETCH_ERROR), and
+    anything else is parsed and cached. A 304 whose cached HTML has gone
+    missing or unreadable is fetched again through `refetch()`, which returns
+    (html, response_meta) for an unconditional request, and parsed so that the
+    cache entry is written again. Shared by run_pipeline
+    and the crawl so each of these shortcuts lives in one place.
+    """
+    refetched = False
+    if cache and response_meta.get('status') == 304:
+        html = cache.cached_html(cache_key)
+        if html is None and refetch is not None:
+            RUN_METRICS.incr('cache_refetch_total')
+            print(f"\nCached page for channel {channel_id} is missing or unreadable after a 304; "
+                  "fetching it again without validators.")
+            html, response_meta = refetch()
+            refetched = True
+        else:
+            cache.mark_fresh(cache_key)
+    schedule_object = None
+    if cache and html and not refetched:
+        with RUN_METRICS.time_stage('cache_lookup'):
+            schedule_object, needs_writing = _reuse_cached_schedule(cache, cache_key, html, ok_filenames)
+        if schedule_object is not None:
+            RUN_METRICS.incr('cache_hits_total')
+            cache.mark_fresh(cache_key)
+            print(f"\nSchedule for channel {channel_id} unchanged (content hash match).")
+    elif cache and html is None and SERVE_STALE_ON_FETCH_ERROR:
+        schedule_object, needs_writing = _serve_stale_schedule(cache, cache_key, ok_filenames)
+        if schedule_object is not None:
+            RUN_METRICS.incr('stale_served_total')
+            print(f"\nFailed to fetch HTML for channel {channel_id}. Serving the last good cached schedule "
+                  f"({schedule_object.get('date_displayed')}) with is_on_air recomputed.")
+    if schedule_object is not None:
+        print("Patched is_on_air without re-parsing." if needs_writing else "Outputs left as they are.")
+        return schedule_object, False, needs_writing
+
+    schedule_object, is_error = build_output_object(
+        html, channel_id, requested_date_context(date_str, today_kst_str), parser_backend=parser_backend
+    )
+    if not html:
+        print(f"\nFailed to fetch HTML for channel {channel_id}. Error output will be generated.")
+    elif is_error:
+        print(f"\nError data prepared (from parsing): {schedule_object.get('error_summary')}")
+    else:
+        print(f"\nSchedule data prepared for channel {channel_id}: {schedule_object.get('date_displayed')}")
+        if cache:
+            previous_entry = cache.load(cache_key) or {}
+            cache.store(cache_key, html, schedule_object, response_meta.get('etag'), response_meta.get('last_modified'))
+            # The page changed (e.g. markup only) but not its programs: keep the outputs as they are
+            outputs_exist = all(os.path.exists(filename) for filename in ok_filenames)
+            if outputs_exist and schedule_unchanged(previous_entry.get('schedule'), schedule_object):
+                print("No program changes; outputs left as they are.")
+                return schedule_object, False, False
+    return schedule_object, is_error, True
+
+def run_pipeline(channel_ids, num_days, emitters, channel_type=DEFAULT_CHANNEL_TYPE,
+                 view_type_val=DEFAULT_VIEW_TYPE, parser_backend=PARSER_BACKEND, cache_dir=SCHEDULE_CACHE_DIR,
+                 url=KT_SCHEDULE_URL, fetch_policy=None, session=None,
+                 refetch_jobs=None, previous_results=None, cache_max_age=CACHE_MAX_AGE, keep_results=False):
+    """
+    Fetches channel_ids x num_days concurrently and parses and writes each page
+    through every emitter as soon as it arrives, so only pages still in flight
+    (or waiting for their turn at an aggregate emitter) are held in memory.
+    With a cache directory, unchanged pages skip parsing, and are not rewritten
+    at all unless the on-air program moved; a page whose fetch failed after
+    retries falls back to its last good cached schedule (SERVE_STALE_ON_FETCH_ERROR).
+    With `previous_results` (an earlier return value), only the jobs in
+    `refetch_jobs` (and jobs with no previous result) hit the network; the rest
+    have is_on_air recomputed in memory and are rewritten only if it moved.
+    Jobs whose cached page is younger than `cache_max_age` seconds are served
+    from the cache the same way; when no job is left to fetch, neither the HTTP
+    client nor the parser is imported. `fetch_policy` None is the default policy.
+    Returns {(channel_id, date): (ChannelDaySchedule, is_error)} when
+    `keep_results` is set (the daemon), an empty dict otherwise. Stage timings and counters go to
+    RUN_METRICS and, when configured, the run report.
+    """
+    if keep_results:
+        from .records import ChannelDaySchedule
+    RUN_METRICS.reset()
+    now_kst_for_log = datetime.now(timezone.utc).astimezone(KST_TIMEZONE)
+    today_kst_str = now_kst_for_log.strftime('%Y%m%d')
+    dates_to_fetch = build_fetch_dates(num_days, now_kst_for_log)
+    single_output = len(channel_ids) == 1 and dates_to_fetch == [None]
+    cache = ScheduleCache(cache_dir) if cache_dir else None
+    # Per-job emitters write one file per channel/day; aggregate ones (e.g. XMLTV) merge the whole run
+    file_emitters = [e for e in emitters if not e.aggregate]
+    aggregate_emitters = [e for e in emitters if e.aggregate]
+
+    print(f"--- Script run at {now_kst_for_log.strftime('%Y-%m-%d %H:%M:%S KST')} ---")
+    print(f"\n--- Attempting to fetch {len(channel_ids)} channel(s) x {len(dates_to_fetch)} day(s) "
+          f"for output format(s): {', '.join(e.name for e in emitters)} ---")
+
+    jobs = [(channel_id, date_str) for channel_id in channel_ids for date_str in dates_to_fetch]
+    previous_results = previous_results or {}
+    jobs_to_fetch = [
+        job for job in jobs
+        if job not in previous_results or refetch_jobs is None or job in refetch_jobs
+    ]
+    cache_keys = {
+        job: ScheduleCache.key_for(job[0], job[1] or today_kst_str, channel_type)
+        for job in jobs
+    }
+    fresh_entries = {}
+    if cache and cache_max_age > 0:
+        for job in jobs_to_fetch:
+            entry = _fresh_cache_entry(cache, cache_keys[job], cache_max_age)
+            if entry is not None:
+                fresh_entries[job] = entry
+        jobs_to_fetch = [job for job in jobs_to_fetch if job not in fresh_entries]
+    if len(jobs_to_fetch) < len(jobs):
+        print(f"{len(jobs) - len(jobs_to_fetch)} channel-day(s) kept in memory or fresh in the cache; fetching {len(jobs_to_fetch)}.")
+
+    def add_to_aggregates(schedule_object):
+        for emitter in aggregate_emitters:
+            with RUN_METRICS.time_stage('emit', emitter=emitter.name):
+                emitter.add(schedule_object)
+
+    def finish_job(job, schedule_object_or_error, is_error, needs_writing):
+        target_channel_id, date_to_fetch_param = job
+        # Channel ids repeat across ch_types; aggregate outputs key on both (cache.channel_key)
+        schedule_object_or_error['channel_type'] = channel_type
+        if needs_writing:
+            # Top-level dictionary with a "data" key holding an array of our object
+            final_output_structure = {
+                "data": [schedule_object_or_error]
+            }
+            filenames = _output_filenames(file_emitters, is_error, target_channel_id,
+                                          date_to_fetch_param or today_kst_str, single_output)
+            for emitter, filename in zip(file_emitters, filenames):
+                with RUN_METRICS.time_stage('emit', emitter=emitter.name):
+                    emitter.emit(final_output_structure, filename)
+        if keep_results:
+            # Held between daemon ticks in compact form; the dict view is rebuilt only to write it again
+            results[job] = (ChannelDaySchedule.from_dict(schedule_object_or_error), is_error)
+        if aggregate_emitters:
+            handoff.complete(job, schedule_object_or_error)
+
+    for emitter in aggregate_emitters:
+        with RUN_METRICS.time_stage('emit', emitter=emitter.name):
+            emitter.open()
+    results = {}
+    handoff = OrderedHandoff(jobs, add_to_aggregates)
+
+    # Channel-days that need no request are settled first, while nothing is in flight
+    for job in jobs:
+        if job in jobs_to_fetch:
+            continue
+        target_channel_id, date_to_fetch_param = job
+        output_date_str = date_to_fetch_param or today_kst_str
+        ok_filenames = _output_filenames(file_emitters, False, target_channel_id, output_date_str, single_output)
+        if job in fresh_entries:
+            RUN_METRICS.incr('cache_fresh_total')
+            schedule_object_or_error, needs_writing = _refresh_cached_schedule(cache, cache_keys[job], fresh_entries[job], ok_filenames)
+            is_error = False
+            if needs_writing:
+                print(f"\nOn-air program moved for channel {target_channel_id} ({output_date_str}); refreshing from the fresh cache.")
+        else:
+            previous_schedule, is_error = previous_results[job]
+            schedule_object_or_error = previous_schedule.to_dict()
+            needs_writing = not is_error and _patch_on_air(schedule_object_or_error, ok_filenames)
+            if needs_writing:
+                print(f"\nOn-air program moved for channel {target_channel_id} ({output_date_str}); refreshing from memory.")
+        finish_job(job, schedule_object_or_error, is_error, needs_writing)
+
+    if jobs_to_fetch:
+        from .fetch import DEFAULT_FETCH_POLICY, fetch_schedule_html_post, iter_schedules_concurrently
+        extra_headers_by_job = {job: cache.conditional_headers(cache_keys[job]) for job in jobs_to_fetch} if cache else None
+        response_meta_by_job = {}
+        pages = iter_schedules_concurrently(
+            channel_ids,
+            dates_to_fetch,
+            channel_type=channel_type,
+            view_type_val=view_type_val,
+            session=session,
+            extra_headers_by_job=extra_headers_by_job,
+            response_meta_by_job=response_meta_by_job,
+            url=url,
+            policy=fetch_policy or DEFAULT_FETCH_POLICY,
+            jobs=jobs_to_fetch
+        )
+        while True:
+            # Only the time spent waiting for the next page; parsing and writing are timed on their own
+            with RUN_METRICS.time_stage('fetch_wait'):
+                job, html = next(pages, (None, None))
+            if job is None:
+                break
+            target_channel_id, date_to_fetch_param = job
+            ok_filenames = _output_filenames(file_emitters, False, target_channel_id,
+                                             date_to_fetch_param or today_kst_str, single_output)
+
+            def refetch(job=job):
+                response_meta = {}
+                html = fetch_schedule_html_post(job[0], job[1], channel_type, view_type_val, session=session,
+                                                response_meta=response_meta, url=url,
+                                                policy=fetch_policy or DEFAULT_FETCH_POLICY)
+                return html, response_meta
+
+            schedule_object_or_error, is_error, needs_writing = resolve_fetched_page(
+                cache, cache_keys[job], html, response_meta_by_job.get(job, {}), target_channel_id,
+                date_to_fetch_param, today_kst_str, ok_filenames, parser_backend, refetch=refetch
+            )
+            finish_job(job, schedule_object_or_error, is_error, needs_writing)
+
+    for emitter in aggregate_emitters:
+        with RUN_METRICS.time_stage('emit', emitter=emitter.name):
+            emitter.close()
+
+    print_stage_summary()
+    write_run_report()
+    dump_profiles()
+    return results
+
+def main(default_formats=('json', 'xml'), argv=None):
+    """
+    Entry point shared by the scripts; OUTPUT_FORMATS overrides the caller's
+    default formats. `--daemon` (or DAEMON_MODE=1) stays resident instead of
+    running once.
+    """
+    parser = argparse.ArgumentParser(description="Fetch KT TV schedules and write them in every configured format.")
+    parser.add_argument('--daemon', action='store_true', default=DAEMON_MODE,
+                        help="Stay resident: re-fetch on an adaptive schedule and refresh is_on_air at program boundaries")
+    args = parser.parse_args(argv)
+    emitters = build_emitters(OUTPUT_FORMATS or list(default_formats))
+    if args.daemon:
+        from .daemon import ScheduleDaemon
+        ScheduleDaemon(CHANNEL_IDS, FETCH_DAYS, emitters).run_forever()
+        return
+    run_pipeline(CHANNEL_IDS, FETCH_DAYS, emitters)
@@ -0,0 +1,185 @@
+"""Compact in-memory program records for holding many channel-days at once."""
+import sys
+import threading
+from dataclasses import dataclass
+
+from .timeline import annotate_program_times, program_end_epochs, program_start_epochs
+
+# Top-level keys the timeline annotation derives from the programs; they are recomputed, not stored
+_DERIVED_SCHEDULE_KEYS = ('program_start_epochs_utc', 'schedule_end_epoch_utc')
+
+class InternTable:
+    """Maps repeated strings (genres, icon labels) to small integer ids, shared process-wide."""
+    __slots__ = ('_ids', '_values', '_lock')
+
+    def __init__(self):
+        self._ids = {}
+        self._values = []
+        self._lock = threading.Lock()
+
+    def intern(self, value):
+        value_id = self._ids.get(value)
+        if value_id is None:
+            with self._lock:
+                value_id = self._ids.get(value)
+                if value_id is None:
+                    value_id = len(self._values)
+                    self._values.append(sys.intern(value))
+                    self._ids[value] = value_id
+        return value_id
+
+    def lookup(self, value):
+        """The id of an already interned value, or None (never adds it)."""
+        return self._ids.get(value)
+
+    def value(self, value_id):
+        return self._values[value_id]
+
+    def __len__(self):
+        return len(self._values)
+
+GENRES = InternTable()
+# Icon ids double as bit positions in ProgramRecord.icon_mask
+ICONS = InternTable()
+
+def _icon_ids_from_mask(icon_mask):
+    icon_ids = []
+    bit = 0
+    while icon_mask:
+        if icon_mask & 1:
+            icon_ids.append(bit)
+        icon_mask >>= 1
+        bit += 1
+    return icon_ids
+
+@dataclass(slots=True)
+class ProgramRecord:
+    """
+    One program in compact form: start as minutes since midnight, interned
+    title, genre id and the icon set packed into a bitmask of ICONS ids.
+    `icon_order` is only kept when the icons are not in ascending-id order
+    (or repeat), and `raw_time` only when the time is not a plain HH:MM.
+    """
+    start_minute: int
+    title: str
+    is_on_air: bool
+    genre_id: int
+    icon_mask: int
+    icon_order: tuple = None
+    raw_time: str = None
+
+    @classmethod
+    def from_fields(cls, time_str, title, is_on_air, icons, genre):
+        icon_ids = [ICONS.intern(icon) for icon in icons]
+        icon_mask = 0
+        for icon_id in icon_ids:
+            icon_mask |= 1 << icon_id
+        icon_order = None
+        if icon_ids != _icon_ids_from_mask(icon_mask):
+            icon_order = tuple(icon_ids)
+        start_minute, raw_time = -1, time_str
+        hours, _, minutes = time_str.partition(':')
+        if len(hours) == 2 and len(minutes) == 2 and hours.isdigit() and minutes.isdigit():
+            start_minute, raw_time = int(hours) * 60 + int(minutes), None
+        return cls(start_minute, sys.intern(title), is_on_air, GENRES.intern(genre), icon_mask, icon_order, raw_time)
+
+    @classmethod
+    def from_dict(cls, program):
+        return cls.from_fields(program['time'], program['title'], program['is_on_air'], program['icons'], program['genre'])
+
+    @property
+    def time(self):
+        if self.raw_time is not None:
+            return self.raw_time
+        return f"{self.start_minute // 60:02d}:{self.start_minute % 60:02d}"
+
+    @property
+    def genre(self):
+        return GENRES.value(self.genre_id)
+
+    @property
+    def icons(self):
+        icon_ids = self.icon_order if self.icon_order is not None else _icon_ids_from_mask(self.icon_mask)
+        return [ICONS.value(icon_id) for icon_id in icon_ids]
+
+    def has_icon(self, icon):
+        icon_id = ICONS.lookup(icon)
+        return icon_id is not None and bool(self.icon_mask >> icon_id & 1)
+
+    def __reduce__(self):
+        # Interned ids are only meaningful in this process; re-intern on unpickling (bulk worker results)
+        return (ProgramRecord.from_fields, (self.time, self.title, self.is_on_air, self.icons, self.genre))
+
+    def to_dict(self):
+        return {
+            'time': self.time,
+            'title': self.title,
+            'is_on_air': self.is_on_air,
+            'icons': self.icons,
+            'genre': self.genre,
+        }
+
+@dataclass(slots=True)
+class ChannelDaySchedule:
+    """
+    A parsed channel-day: the top-level fields before and after `programs`
+    (kept in their original order) and the programs as ProgramRecords
+    (None for error objects that never had a programs list).
+    Epoch annotations are recomputed on to_dict() (and get()) rather than stored.
+    The daemon, the API server and the bulk workers hold these; emitters and
+    payloads get the to_dict() view.
+    """
+    fields_before: dict
+    programs: list
+    fields_after: dict
+    annotated: bool = False
+
+    @classmethod
+    def from_parsed(cls, schedule_data):
+        """Splits a schedule dict whose programs are already ProgramRecords (or dicts)."""
+        fields_before, fields_after, programs = {}, {}, None
+        annotated = False
+        target = fields_before
+        for key, value in schedule_data.items():
+            if key == 'programs':
+                programs = [p if isinstance(p, ProgramRecord) else ProgramRecord.from_dict(p) for p in value]
+                annotated = any('start_epoch_utc' in p for p in value if isinstance(p, dict))
+                target = fields_after
+            elif key in _DERIVED_SCHEDULE_KEYS:
+                # Placeholder keeps the key's position; the value is recomputed on to_dict()
+                target[key] = None
+                annotated = True
+            else:
+                target[key] = value
+        return cls(fields_before, programs, fields_after, annotated)
+
+    from_dict = from_parsed
+
+    @property
+    def is_error(self):
+        return 'error_summary' in self.fields_before or 'error_summary' in self.fields_after
+
+    def start_epochs(self):
+        """program_start_epochs_utc, worked out from the records without building the dict view."""
+        times = [{'time': program.time} for program in self.programs or ()]
+        return program_start_epochs({'date_displayed': self.get('date_displayed'), 'programs': times})
+
+    def get(self, key, default=None):
+        if key in _DERIVED_SCHEDULE_KEYS and self.annotated:
+            start_epochs = self.start_epochs()
+            if key == 'program_start_epochs_utc':
+                return start_epochs
+            return program_end_epochs(start_epochs)[-1] if start_epochs else None
+        if key in self.fields_before:
+            return self.fields_before[key]
+        return self.fields_after.get(key, default)
+
+    def to_dict(self):
+        """The plain dict/JSON view, identical to what the dict parser produces."""
+        schedule_data = dict(self.fields_before)
+        if self.programs is not None:
+            schedule_data['programs'] = [program.to_dict() for program in self.programs]
+        schedule_data.update(self.fields_after)
+        if self.annotated:
+            annotate_program_times(schedule_data)
+        return schedule_data
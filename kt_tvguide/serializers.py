@@ -0,0 +1,65 @@
+"""
+Serializers for the {"data": [...]} structure: indented or compact JSON
+(through orjson when it is installed), NDJSON with one program per line, and
+MessagePack for archives.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def dumps_json(data, indent=None):
+    """
+    UTF-8 JSON bytes with non-ASCII text kept as is. indent=2 matches
+    json.dump(..., indent=2); None is compact. orjson handles indent None or 2
+    and hands anything it refuses (non-str keys, ints wider than 64 bits) to
+    the stdlib, so the result does not depend on which one is installed.
+    """
+    if orjson is not None and indent in (None, 2):
+        try:
+            return orjson.dumps(data, option=orjson.OPT_INDENT_2 if indent else 0)
+        except TypeError:
+            pass
+    if indent:
+        return json.dumps(data, indent=indent, ensure_ascii=False).encode('utf-8')
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def loads_json(raw):
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+def iter_ndjson_lines(output_structure):
+    """
+    One compact JSON line per program, carrying its channel and date, so the
+    file can be appended to, grepped and streamed without loading it whole.
+    Error objects become a single line.
+    """
+    for schedule_object in output_structure.get("data") or []:
+        if "error_summary" in schedule_object or not schedule_object.get("programs"):
+            yield dumps_json(schedule_object) + b"\n"
+            continue
+        context = {
+            "channel_id": schedule_object.get("channel_id_requested"),
+            "channel_name": schedule_object.get("channel_name"),
+            "date": schedule_object.get("date_displayed"),
+        }
+        for program in schedule_object["programs"]:
+            yield dumps_json(dict(context, **program)) + b"\n"
+
+def dumps_msgpack(data):
+    """MessagePack bytes; msgpack is imported on first use so the JSON-only paths never load it."""
+    import msgpack
+    return msgpack.packb(data, use_bin_type=True)
+
+def loads_msgpack(raw):
+    import msgpack
+    return msgpack.unpackb(raw, raw=False, strict_map_key=False)
+
+# Name -> function(output_structure) returning the file's bytes; used by the emitters and benchmarks/serializers.py
+SERIALIZERS = {
+    'json': lambda data: dumps_json(data, indent=2),
+    'json-compact': dumps_json,
+    'ndjson': lambda data: b''.join(iter_ndjson_lines(data)),
+    'msgpack': dumps_msgpack,
+}
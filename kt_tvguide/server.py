@@ -0,0 +1,189 @@
+"""
+A small asyncio HTTP API serving TRMNL-ready {"data": [...]} payloads straight
+from the in-memory schedules kept by the resident daemon, so a poll sees new
+data without waiting for a cron run and a git push.
+
+    python -m kt_tvguide.server --port 8080
+
+    GET /                           channels and days available
+    GET /schedule/<channel_id>      the full schedule (same shape as the JSON output)
+    GET /now-next/<channel_id>      on-air + next program, for plugin/now-next-layout.html
+    GET /window/<channel_id>        the 5 programs plugin/markup.html shows
+    ...?date=YYYYMMDD               another fetched day instead of today
+
+Payloads are built once per program boundary and served from memory with an
+ETag; a matching If-None-Match gets a 304.
+"""
+import argparse
+import asyncio
+import hashlib
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import parse_qs, urlsplit
+
+from .config import API_HOST, API_PORT, CHANNEL_IDS, FETCH_DAYS, KST_TIMEZONE, OUTPUT_FORMATS
+from .layouts import LAYOUTS
+from .serializers import dumps_json
+from .timeline import next_boundary_epoch
+
+MAX_REQUEST_HEAD_BYTES = 16384
+KEEP_ALIVE_TIMEOUT_SECONDS = 15
+
+def _etag(body):
+    return '"' + hashlib.sha256(body).hexdigest()[:20] + '"'
+
+class PayloadCache:
+    """
+    Rendered payload per (layout, channel, date): reused until the next program
+    boundary or until the results it was built from are replaced.
+    """
+
+    def __init__(self, get_results):
+        self.get_results = get_results
+        self._entries = {}
+
+    def _select_job(self, results, channel_id, date_str):
+        today_kst = datetime.now(timezone.utc).astimezone(KST_TIMEZONE).strftime('%Y%m%d')
+        wanted = date_str or today_kst
+        candidates = [job for job in results if job[0] == channel_id]
+        for job in candidates:
+            if (job[1] or today_kst) == wanted:
+                return job
+        return None
+
+    def lookup(self, layout, channel_id, date_str=None, now_epoch=None):
+        """(body, etag) for the layout, or None if the channel/day is not loaded."""
+        now_epoch = int(time.time()) if now_epoch is None else now_epoch
+        results = self.get_results()
+        key = (layout, channel_id, date_str)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] is results and now_epoch < entry[1]:
+            return entry[2], entry[3]
+        job = self._select_job(results, channel_id, date_str)
+        if job is None:
+            return None
+        schedule, is_error = results[job]
+        # The daemon holds compact ChannelDaySchedules; the dict view is built only for a new payload
+        schedule_object = schedule.to_dict()
+        if is_error:
+            payload = {"data": [schedule_object]}
+            valid_until = float('inf')
+        else:
+            payload = {"data": [LAYOUTS[layout](schedule_object, now_epoch)]}
+            boundary = next_boundary_epoch(schedule_object, now_epoch)
+            valid_until = boundary if boundary is not None else float('inf')
+        body = dumps_json(payload)
+        etag = _etag(body)
+        self._entries[key] = (results, valid_until, body, etag)
+        return body, etag
+
+    def index(self):
+        results = self.get_results()
+        channels = {}
+        for (channel_id, date_str), (schedule_object, is_error) in results.items():
+            channels.setdefault(channel_id, []).append({
+                'date': date_str,
+                'date_displayed': schedule_object.get('date_displayed'),
+                'channel_name': schedule_object.get('channel_name'),
+                'is_error': is_error,
+            })
+        return dumps_json({'layouts': sorted(LAYOUTS), 'channels': channels})
+
+class ScheduleAPIServer:
+    """HTTP/1.1 (keep-alive, GET/HEAD only) on asyncio streams, backed by a PayloadCache."""
+
+    def __init__(self, payloads, host=API_HOST, port=API_PORT):
+        self.payloads = payloads
+        self.host = host
+        self.port = port
+
+    def route(self, method, target, headers):
+        """(status, body, extra_headers) for one request."""
+        if method not in ('GET', 'HEAD'):
+            return 405, b'', {'Allow': 'GET, HEAD'}
+        url = urlsplit(target)
+        parts = [part for part in url.path.split('/') if part]
+        if not parts:
+            return 200, self.payloads.index(), {}
+        if len(parts) != 2 or parts[0] not in LAYOUTS:
+            return 404, dumps_json({'error': 'Unknown path', 'layouts': sorted(LAYOUTS)}), {}
+        date_str = parse_qs(url.query).get('date', [None])[0]
+        found = self.payloads.lookup(parts[0], parts[1], date_str)
+        if found is None:
+            return 404, dumps_json({'error': f"No schedule loaded for channel {parts[1]}"}), {}
+        body, etag = found
+        if headers.get('if-none-match') == etag:
+            return 304, b'', {'ETag': etag}
+        return 200, body, {'ETag': etag}
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), KEEP_ALIVE_TIMEOUT_SECONDS)
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ConnectionError):
+                    return
+                except asyncio.CancelledError:
+                    # Server shutting down with this keep-alive connection idle
+                    return
+                lines = head.decode('latin-1').split('\r\n')
+                try:
+                    method, target, version = lines[0].split(' ', 2)
+                except ValueError:
+                    return
+                headers = {}
+                for line in lines[1:]:
+                    if ':' in line:
+                        name, value = line.split(':', 1)
+                        headers[name.strip().lower()] = value.strip()
+                status, body, extra_headers = self.route(method, target, headers)
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                response_headers = {
+                    'Content-Type': 'application/json; charset=utf-8',
+                    'Content-Length': str(len(body)) if status != 304 else '0',
+                    'Cache-Control': 'no-cache',
+                    'Connection': 'keep-alive' if keep_alive else 'close',
+                }
+                response_headers.update(extra_headers)
+                reason = {200: 'OK', 304: 'Not Modified', 404: 'Not Found', 405: 'Method Not Allowed'}[status]
+                head_out = f"HTTP/1.1 {status} {reason}\r\n" + ''.join(f"{k}: {v}\r\n" for k, v in response_headers.items())
+                writer.write(head_out.encode('latin-1') + b'\r\n')
+                if method != 'HEAD' and status != 304:
+                    writer.write(body)
+                await writer.drain()
+                if not keep_alive:
+                    return
+        finally:
+            writer.close()
+
+    async def serve_forever(self):
+        server = await asyncio.start_server(self.handle, self.host, self.port, limit=MAX_REQUEST_HEAD_BYTES)
+        print(f"Schedule API listening on http://{self.host}:{self.port}/")
+        async with server:
+            await server.serve_forever()
+
+def main(argv=None):
+    from .daemon import ScheduleDaemon
+    from .emitters import build_emitters
+
+    parser = argparse.ArgumentParser(prog='python -m kt_tvguide.server', description=__doc__.split('\n\n')[0])
+    parser.add_argument('--host', default=API_HOST)
+    parser.add_argument('--port', type=int, default=API_PORT)
+    args = parser.parse_args(argv)
+
+    # The daemon keeps results fresh (and still writes any OUTPUT_FORMATS files); the API only reads them
+    daemon = ScheduleDaemon(CHANNEL_IDS, FETCH_DAYS, build_emitters(OUTPUT_FORMATS))
+    daemon_thread = threading.Thread(target=daemon.run_forever, daemon=True)
+    daemon_thread.start()
+    api = ScheduleAPIServer(PayloadCache(lambda: daemon.results), args.host, args.port)
+    try:
+        asyncio.run(api.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.stop()
+        daemon_thread.join(timeout=5)
+
+if __name__ == "__main__":
+    main()
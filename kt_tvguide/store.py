@@ -0,0 +1,273 @@
+"""Local SQLite store of parsed programs, indexed for time-range and title queries."""
+import argparse
+import hashlib
+import json
+import sys
+import time
+from datetime import datetime, timedelta
+
+from .cache import channel_key
+from .config import KST_TIMEZONE, SCHEDULE_STORE_PATH
+from .timeline import annotate_program_times
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS channels (
+    channel_id TEXT PRIMARY KEY,
+    channel_name TEXT,
+    channel_logo_url TEXT
+);
+CREATE TABLE IF NOT EXISTS channel_days (
+    channel_id TEXT NOT NULL,
+    schedule_date TEXT NOT NULL,
+    programs_hash TEXT NOT NULL,
+    updated_epoch_utc INTEGER NOT NULL,
+    PRIMARY KEY (channel_id, schedule_date)
+);
+CREATE TABLE IF NOT EXISTS programs (
+    channel_id TEXT NOT NULL,
+    schedule_date TEXT NOT NULL,
+    start_epoch_utc INTEGER NOT NULL,
+    end_epoch_utc INTEGER NOT NULL,
+    time TEXT NOT NULL,
+    title TEXT NOT NULL,
+    genre TEXT,
+    icons TEXT,
+    PRIMARY KEY (channel_id, schedule_date, start_epoch_utc)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_programs_channel_start ON programs (channel_id, start_epoch_utc);
+CREATE INDEX IF NOT EXISTS idx_programs_start ON programs (start_epoch_utc, end_epoch_utc);
+CREATE INDEX IF NOT EXISTS idx_programs_title ON programs (title, start_epoch_utc);
+CREATE INDEX IF NOT EXISTS idx_programs_date_genre ON programs (schedule_date, genre);
+"""
+
+_PROGRAM_COLUMNS = 'channel_id, schedule_date, start_epoch_utc, end_epoch_utc, time, title, genre, icons'
+
+def _program_rows(schedule_data):
+    channel_id = channel_key(schedule_data)
+    schedule_date = schedule_data.get('date_displayed')
+    for program in schedule_data.get('programs', []):
+        yield (
+            channel_id,
+            schedule_date,
+            program['start_epoch_utc'],
+            program['end_epoch_utc'],
+            program['time'],
+            program['title'],
+            program.get('genre'),
+            json.dumps(program.get('icons', []), ensure_ascii=False),
+        )
+
+class ScheduleStore:
+    """
+    Programs keyed by (channel_id, schedule_date, start_epoch_utc). Upserts are
+    incremental: an unchanged channel-day is skipped via its programs hash, and
+    a changed one only touches the rows that were added, changed or removed.
+    """
+
+    def __init__(self, path=SCHEDULE_STORE_PATH):
+        import sqlite3
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def upsert_schedule(self, schedule_data):
+        """
+        Stores one parsed channel-day. Returns the number of program rows
+        written or deleted (0 when the day is unchanged or is an error object).
+        """
+        if 'error_summary' in schedule_data or not schedule_data.get('programs'):
+            return 0
+        if 'start_epoch_utc' not in schedule_data['programs'][0]:
+            schedule_data = annotate_program_times(dict(schedule_data, programs=[dict(p) for p in schedule_data['programs']]))
+            if 'start_epoch_utc' not in schedule_data['programs'][0]:
+                return 0
+        channel_id = channel_key(schedule_data)
+        schedule_date = schedule_data.get('date_displayed')
+        rows = list(_program_rows(schedule_data))
+        programs_hash = hashlib.sha256(json.dumps(rows, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+        with self.connection:
+            existing = self.connection.execute(
+                'SELECT programs_hash FROM channel_days WHERE channel_id = ? AND schedule_date = ?',
+                (channel_id, schedule_date)
+            ).fetchone()
+            self.connection.execute(
+                'INSERT INTO channels (channel_id, channel_name, channel_logo_url) VALUES (?, ?, ?) '
+                'ON CONFLICT (channel_id) DO UPDATE SET channel_name = excluded.channel_name, '
+                'channel_logo_url = excluded.channel_logo_url',
+                (channel_id, schedule_data.get('channel_name'), schedule_data.get('channel_logo_url'))
+            )
+            if existing and existing['programs_hash'] == programs_hash:
+                return 0
+            new_starts = {row[2] for row in rows}
+            stale_starts = [
+                (channel_id, schedule_date, row['start_epoch_utc'])
+                for row in self.connection.execute(
+                    'SELECT start_epoch_utc FROM programs WHERE channel_id = ? AND schedule_date = ?',
+                    (channel_id, schedule_date)
+                )
+                if row['start_epoch_utc'] not in new_starts
+            ]
+            self.connection.executemany(
+                'DELETE FROM programs WHERE channel_id = ? AND schedule_date = ? AND start_epoch_utc = ?',
+                stale_starts
+            )
+            changed = self.connection.executemany(
+                f'INSERT INTO programs ({_PROGRAM_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT (channel_id, schedule_date, start_epoch_utc) DO UPDATE SET '
+                'end_epoch_utc = excluded.end_epoch_utc, time = excluded.time, title = excluded.title, '
+                'genre = excluded.genre, icons = excluded.icons '
+                'WHERE programs.end_epoch_utc IS NOT excluded.end_epoch_utc OR programs.title IS NOT excluded.title '
+                'OR programs.genre IS NOT excluded.genre OR programs.icons IS NOT excluded.icons '
+                'OR programs.time IS NOT excluded.time',
+                rows
+            ).rowcount
+            self.connection.execute(
+                'INSERT INTO channel_days (channel_id, schedule_date, programs_hash, updated_epoch_utc) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (channel_id, schedule_date) DO UPDATE SET programs_hash = excluded.programs_hash, '
+                'updated_epoch_utc = excluded.updated_epoch_utc',
+                (channel_id, schedule_date, programs_hash, int(time.time()))
+            )
+        return changed + len(stale_starts)
+
+    def program_at(self, channel_id, epoch_utc):
+        """
+        The program airing on `channel_id` at `epoch_utc`, or None. Where two
+        schedule_dates overlap (one day's 24:xx rows, the next day's 00:xx rows),
+        the later schedule_date wins.
+        """
+        row = self.connection.execute(
+            f'SELECT {_PROGRAM_COLUMNS} FROM programs WHERE channel_id = ? AND start_epoch_utc <= ? AND end_epoch_utc > ? '
+            'ORDER BY start_epoch_utc DESC, schedule_date DESC LIMIT 1',
+            (channel_id, epoch_utc, epoch_utc)
+        ).fetchone()
+        return dict(row) if row is not None else None
+
+    def airings(self, title, start_epoch_utc=None, end_epoch_utc=None, channel_id=None, exact=True):
+        """All airings of a title (exact, or substring when exact=False) within an optional time range."""
+        if exact:
+            clauses = ['title = ?']
+            params = [title]
+        else:
+            # Escape LIKE wildcards so '%' and '_' in the search text match literally
+            clauses = ["title LIKE '%' || ? || '%' ESCAPE '\\'"]
+            params = [title.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')]
+        if start_epoch_utc is not None:
+            clauses.append('start_epoch_utc >= ?')
+            params.append(start_epoch_utc)
+        if end_epoch_utc is not None:
+            clauses.append('start_epoch_utc < ?')
+            params.append(end_epoch_utc)
+        if channel_id is not None:
+            clauses.append('channel_id = ?')
+            params.append(channel_id)
+        return [dict(row) for row in self.connection.execute(
+            f'SELECT {_PROGRAM_COLUMNS} FROM programs WHERE {" AND ".join(clauses)} ORDER BY start_epoch_utc',
+            params
+        )]
+
+    def genre_counts(self, first_date, last_date, channel_id=None):
+        """{schedule_date: {genre: count}} for dates (YYYY-MM-DD) in [first_date, last_date]."""
+        query = 'SELECT schedule_date, genre, COUNT(*) AS n FROM programs WHERE schedule_date BETWEEN ? AND ?'
+        params = [first_date, last_date]
+        if channel_id is not None:
+            query += ' AND channel_id = ?'
+            params.append(channel_id)
+        counts = {}
+        for row in self.connection.execute(query + ' GROUP BY schedule_date, genre ORDER BY schedule_date, n DESC', params):
+            counts.setdefault(row['schedule_date'], {})[row['genre']] = row['n']
+        return counts
+
+class StoreEmitter:
+    """Upserts every parsed channel-day of a run into the SQLite store."""
+    name = 'sqlite'
+    aggregate = True
+
+    def __init__(self, output_filename=SCHEDULE_STORE_PATH):
+        self.output_filename = output_filename
+        self._store = None
+        self._rows_changed = 0
+
+    def open(self):
+        self._store = ScheduleStore(self.output_filename)
+        self._rows_changed = 0
+
+    def add(self, schedule_object):
+        self._rows_changed += self._store.upsert_schedule(schedule_object)
+
+    def close(self):
+        self._store.close()
+        self._store = None
+        print(f"Schedule store {self.output_filename} updated ({self._rows_changed} program row(s) changed)")
+
+def _parse_when(value):
+    """Epoch seconds, or an ISO date/time (KST when no offset is given)."""
+    if value is None:
+        return int(time.time())
+    if value.isdigit():
+        return int(value)
+    when = datetime.fromisoformat(value)
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=KST_TIMEZONE)
+    return int(when.timestamp())
+
+def _print_program(program):
+    start = datetime.fromtimestamp(program['start_epoch_utc'], KST_TIMEZONE).strftime('%Y-%m-%d %H:%M')
+    print(f"{program['channel_id']}\t{start}\t{program['title']}\t{program['genre']}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m kt_tvguide.store', description='Query or fill the local schedule store.')
+    parser.add_argument('--db', default=SCHEDULE_STORE_PATH, help='SQLite file (default: %(default)s)')
+    commands = parser.add_subparsers(dest='command', required=True)
+    import_cmd = commands.add_parser('import', help='Upsert {"data": [...]} JSON output files')
+    import_cmd.add_argument('files', nargs='+')
+    now_cmd = commands.add_parser('now', help="What's on a channel at a time")
+    now_cmd.add_argument('channel_id')
+    now_cmd.add_argument('--at', help='Epoch seconds or ISO time (KST if no offset); default now')
+    airings_cmd = commands.add_parser('airings', help='All airings of a title')
+    airings_cmd.add_argument('title')
+    airings_cmd.add_argument('--days', type=int, default=7, help='Look this many days ahead from --from (default 7)')
+    airings_cmd.add_argument('--from', dest='from_when', help='Start of the range; default now')
+    airings_cmd.add_argument('--contains', action='store_true', help='Substring match instead of exact title')
+    genres_cmd = commands.add_parser('genres', help='Genre counts per day')
+    genres_cmd.add_argument('first_date', help='YYYY-MM-DD')
+    genres_cmd.add_argument('last_date', nargs='?', help='YYYY-MM-DD (default: first_date)')
+    genres_cmd.add_argument('--channel')
+    args = parser.parse_args(argv)
+
+    with ScheduleStore(args.db) as store:
+        if args.command == 'import':
+            for filename in args.files:
+                with open(filename, 'r', encoding='utf-8') as f:
+                    wrapper = json.load(f)
+                changed = sum(store.upsert_schedule(entry) for entry in wrapper.get('data', []))
+                print(f"{filename}: {changed} program row(s) changed")
+        elif args.command == 'now':
+            program = store.program_at(args.channel_id, _parse_when(args.at))
+            if program is None:
+                print("Nothing on air.")
+                return 1
+            _print_program(program)
+        elif args.command == 'airings':
+            start = _parse_when(args.from_when)
+            end = start + int(timedelta(days=args.days).total_seconds())
+            for program in store.airings(args.title, start, end, exact=not args.contains):
+                _print_program(program)
+        elif args.command == 'genres':
+            counts = store.genre_counts(args.first_date, args.last_date or args.first_date, args.channel)
+            print(json.dumps(counts, ensure_ascii=False, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+"""Program start/end times on the real clock, used to work out what is on air locally."""
+import time
+from bisect import bisect_right
+from datetime import datetime, timedelta, timezone
+
+from .config import KST_TIMEZONE
+
+# The last program of the day has no successor; the templates assume it runs for an hour
+LAST_PROGRAM_ASSUMED_DURATION_SECONDS = 3600
+
+def build_fetch_dates(num_days, start_date_kst=None):
+    """
+    Returns the `seldate` values to fetch. A single day keeps the server
+    default (None) for the current day; several days use explicit YYYYMMDD dates.
+    """
+    if num_days <= 1:
+        return [None]
+    start_date_kst = start_date_kst or datetime.now(timezone.utc).astimezone(KST_TIMEZONE)
+    return [(start_date_kst + timedelta(days=offset)).strftime('%Y%m%d') for offset in range(num_days)]
+
+def program_start_epochs(schedule_data):
+    """
+    Returns the UTC epoch of every program's start, derived from date_displayed
+    and the HH:MM time. Times that go backwards are taken to be past midnight.
+    Returns None when the schedule date or a program time cannot be read.
+    """
+    try:
+        schedule_date = datetime.strptime(schedule_data.get('date_displayed', ''), '%Y-%m-%d')
+    except ValueError:
+        return None
+    day_start_epoch = int(schedule_date.replace(tzinfo=KST_TIMEZONE).timestamp())
+    epochs = []
+    day_offset_seconds = 0
+    previous_minutes = -1
+    for program in schedule_data.get('programs', []):
+        try:
+            hours, minutes = program['time'].split(':')
+            minutes_since_midnight = int(hours) * 60 + int(minutes)
+        except (KeyError, ValueError):
+            return None
+        if minutes_since_midnight < previous_minutes:
+            day_offset_seconds += 86400
+        previous_minutes = minutes_since_midnight
+        epochs.append(day_start_epoch + day_offset_seconds + minutes_since_midnight * 60)
+    return epochs
+
+def program_end_epochs(start_epochs):
+    """Each program ends when the next one starts; the last one gets the assumed duration."""
+    end_epochs = start_epochs[1:]
+    if start_epochs:
+        end_epochs.append(start_epochs[-1] + LAST_PROGRAM_ASSUMED_DURATION_SECONDS)
+    return end_epochs
+
+def find_on_air_index(start_epochs, now_epoch):
+    """Index of the program airing at now_epoch, or -1 if nothing is on air."""
+    if not start_epochs or now_epoch < start_epochs[0]:
+        return -1
+    index = bisect_right(start_epochs, now_epoch) - 1
+    if now_epoch >= program_end_epochs(start_epochs)[index]:
+        return -1
+    return index
+
+def annotate_program_times(schedule_data):
+    """
+    Adds start_epoch_utc, end_epoch_utc and duration_min to every program, plus
+    a sorted program_start_epochs_utc index and schedule_end_epoch_utc at the
+    top level, so templates can find the current slot without any date math.
+    Leaves the schedule untouched if its date or times cannot be read.
+    """
+    start_epochs = program_start_epochs(schedule_data)
+    if start_epochs is None:
+        return schedule_data
+    end_epochs = program_end_epochs(start_epochs)
+    for program, start_epoch, end_epoch in zip(schedule_data.get('programs', []), start_epochs, end_epochs):
+        program['start_epoch_utc'] = start_epoch
+        program['end_epoch_utc'] = end_epoch
+        program['duration_min'] = (end_epoch - start_epoch) // 60
+    schedule_data['program_start_epochs_utc'] = start_epochs
+    schedule_data['schedule_end_epoch_utc'] = end_epochs[-1] if end_epochs else None
+    return schedule_data
+
+def recompute_is_on_air(schedule_data, now_epoch=None):
+    """
+    Sets each program's is_on_air from the current time instead of the
+    server-provided badge. Returns True if any flag changed.
+    """
+    start_epochs = program_start_epochs(schedule_data)
+    if start_epochs is None:
+        return False
+    now_epoch = int(time.time()) if now_epoch is None else now_epoch
+    on_air_index = find_on_air_index(start_epochs, now_epoch)
+    changed = False
+    for index, program in enumerate(schedule_data.get('programs', [])):
+        is_on_air = index == on_air_index
+        if program.get('is_on_air') != is_on_air:
+            program['is_on_air'] = is_on_air
+            changed = True
+    return changed
+
+def next_boundary_epoch(schedule_data, now_epoch):
+    """
+    The first program start (or the schedule's end) after now_epoch, i.e. the
+    next moment is_on_air can change. None if there is none or it cannot be read.
+    """
+    start_epochs = schedule_data.get('program_start_epochs_utc') or program_start_epochs(schedule_data)
+    if not start_epochs:
+        return None
+    boundaries = start_epochs + program_end_epochs(start_epochs)[-1:]
+    index = bisect_right(boundaries, now_epoch)
+    return boundaries[index] if index < len(boundaries) else None
@@ -0,0 +1,122 @@
+"""XMLTV export: every fetched channel/day merged into one standard <tv> document."""
+import filecmp
+import os
+import shutil
+import tempfile
+from datetime import datetime
+
+from .cache import channel_key
+from .config import KST_TIMEZONE, OUTPUT_XMLTV_FILENAME, XMLTV_CHANNEL_ID_SUFFIX
+from .xmlutil import XML_DECLARATION, XML_INDENT, xml_escape_text
+
+XMLTV_LANG = "ko"
+# Gaps longer than this between one day's last program and the next day's first are not bridged
+MAX_BRIDGED_GAP_SECONDS = 6 * 3600
+
+def xmltv_channel_id(channel_id):
+    return f"{channel_id}{XMLTV_CHANNEL_ID_SUFFIX}"
+
+def xmltv_time(epoch_utc):
+    """XMLTV timestamp in KST, e.g. "20250601193000 +0900"."""
+    return datetime.fromtimestamp(epoch_utc, KST_TIMEZONE).strftime('%Y%m%d%H%M%S %z')
+
+def _iter_programme_xml(channel_xmltv_id, program, stop_epoch):
+    indent = XML_INDENT
+    yield (f'{indent}<programme start="{xmltv_time(program["start_epoch_utc"])}" '
+           f'stop="{xmltv_time(stop_epoch)}" channel="{xml_escape_text(channel_xmltv_id)}">\n')
+    yield f'{indent * 2}<title lang="{XMLTV_LANG}">{xml_escape_text(program.get("title", ""))}</title>\n'
+    genre = program.get('genre')
+    if genre and genre != "N/A":
+        yield f'{indent * 2}<category lang="{XMLTV_LANG}">{xml_escape_text(genre)}</category>\n'
+    icons = program.get('icons', [])
+    if 'Hd' in icons:
+        yield f'{indent * 2}<video>\n{indent * 3}<quality>HDTV</quality>\n{indent * 2}</video>\n'
+    for icon in icons:
+        # Age ratings are the icon alt texts mentioning viewing ("시청"), e.g. "전체 시청 가능"
+        if '시청' in icon:
+            yield f'{indent * 2}<rating system="KR">\n{indent * 3}<value>{xml_escape_text(icon)}</value>\n{indent * 2}</rating>\n'
+    yield f'{indent}</programme>\n'
+
+class XmltvEmitter:
+    """
+    Writes one XMLTV file covering every channel/day of the run. Programmes are
+    streamed to a temporary file as schedules arrive (only channel metadata and
+    one pending programme per channel stay in memory). Each programme stops when
+    the next one starts, including across day boundaries when the next day was
+    fetched too. The <channel> list is written first on close, as XMLTV requires.
+    """
+    name = 'xmltv'
+    aggregate = True
+
+    def __init__(self, output_filename=OUTPUT_XMLTV_FILENAME):
+        self.output_filename = output_filename
+        self._programmes_file = None
+        self._channels = {}
+        self._pending_by_channel = {}
+
+    def open(self):
+        self._programmes_file = tempfile.TemporaryFile('w+', encoding='utf-8')
+        self._channels = {}
+        self._pending_by_channel = {}
+
+    def _write_programme(self, channel_xmltv_id, program, stop_epoch):
+        for chunk in _iter_programme_xml(channel_xmltv_id, program, stop_epoch):
+            self._programmes_file.write(chunk)
+
+    def _flush_pending(self, channel_xmltv_id, next_start_epoch=None):
+        pending = self._pending_by_channel.pop(channel_xmltv_id, None)
+        if pending is None:
+            return
+        stop_epoch = pending['end_epoch_utc']
+        if next_start_epoch is not None and 0 < next_start_epoch - pending['start_epoch_utc'] <= \
+                (pending['end_epoch_utc'] - pending['start_epoch_utc']) + MAX_BRIDGED_GAP_SECONDS:
+            stop_epoch = next_start_epoch
+        self._write_programme(channel_xmltv_id, pending, stop_epoch)
+
+    def add(self, schedule_object):
+        """Adds one parsed channel/day. Error objects and unreadable schedules are skipped."""
+        if 'error_summary' in schedule_object:
+            return
+        programs = [p for p in schedule_object.get('programs', []) if 'start_epoch_utc' in p]
+        if not programs:
+            return
+        channel_xmltv_id = xmltv_channel_id(channel_key(schedule_object))
+        self._channels.setdefault(channel_xmltv_id, {
+            'display_name': schedule_object.get('channel_name', channel_xmltv_id),
+            'logo_url': schedule_object.get('channel_logo_url', ''),
+        })
+        self._flush_pending(channel_xmltv_id, programs[0]['start_epoch_utc'])
+        for program, next_program in zip(programs, programs[1:]):
+            self._write_programme(channel_xmltv_id, program, next_program['start_epoch_utc'])
+        # The last program waits for the next day's first start, if that day is added too
+        self._pending_by_channel[channel_xmltv_id] = programs[-1]
+
+    def close(self):
+        for channel_xmltv_id in list(self._pending_by_channel):
+            self._flush_pending(channel_xmltv_id)
+        tmp_filename = f"{self.output_filename}.tmp"
+        try:
+            with open(tmp_filename, 'w', encoding='utf-8') as f:
+                f.write(XML_DECLARATION)
+                f.write('<!DOCTYPE tv SYSTEM "xmltv.dtd">\n')
+                f.write('<tv source-info-url="https://tv.kt.com/" source-info-name="KT TV guide" generator-info-name="kt_tvguide">\n')
+                for channel_xmltv_id, channel in self._channels.items():
+                    f.write(f'{XML_INDENT}<channel id="{xml_escape_text(channel_xmltv_id)}">\n')
+                    f.write(f'{XML_INDENT * 2}<display-name lang="{XMLTV_LANG}">{xml_escape_text(channel["display_name"])}</display-name>\n')
+                    if channel['logo_url']:
+                        f.write(f'{XML_INDENT * 2}<icon src="{xml_escape_text(channel["logo_url"])}"/>\n')
+                    f.write(f'{XML_INDENT}</channel>\n')
+                self._programmes_file.seek(0)
+                shutil.copyfileobj(self._programmes_file, f)
+                f.write('</tv>\n')
+            if os.path.exists(self.output_filename) and filecmp.cmp(tmp_filename, self.output_filename, shallow=False):
+                os.remove(tmp_filename)
+                print(f"XMLTV data unchanged; {self.output_filename} left as it is")
+            else:
+                os.replace(tmp_filename, self.output_filename)
+                print(f"XMLTV data ({len(self._channels)} channel(s)) saved to {self.output_filename}")
+        except IOError as e:
+            print(f"\nError saving XMLTV data to file {self.output_filename}: {e}")
+        finally:
+            self._programmes_file.close()
+            self._programmes_file = None
@@ -0,0 +1,20 @@
+"""Small helpers shared by the XML writers."""
+import re
+
+XML_DECLARATION = '<?xml version="1.0" encoding="utf-8"?>\n'
+XML_INDENT = "  "
+_INVALID_TAG_CHARS = re.compile(r'[^a-zA-Z0-9_.-]')
+
+def sanitize_xml_tag(key_as_tag_name):
+    """Turns a dict key into a valid XML tag name (invalid chars -> "_", no leading digit/"xml")."""
+    sane_tag = _INVALID_TAG_CHARS.sub('_', str(key_as_tag_name))
+    if not sane_tag or sane_tag[0].isdigit() or sane_tag.lower().startswith("xml"):
+        sane_tag = f"item_{sane_tag}" if sane_tag else "item"
+        if sane_tag and sane_tag[0].isdigit():
+            sane_tag = "_" + sane_tag
+    return sane_tag
+
+def xml_escape_text(text):
+    # Same escaping (and newline normalization) the previous ElementTree -> minidom round trip produced
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace("\"", "&quot;").replace(">", "&gt;")